@@ -39,6 +39,9 @@
 #     Each portion is able to have some voices (from 0 to 16).
 #     A voice is one of voice chanel in YMF825.  YMF825 has voices from 0 to 15. 
 #     Each voice use a tone data.  Tone is a set of YMF825 sound parameters.
+#     Each portion has a tone slot in YMF825, any voice can play the tone in any tone slot.
+#     The 16 tone slots are a LRU cache of tones (databank, tone), only tones not in the slots are sent.
+#     Portions having overlapped voice ranges share the voices in their ranges.
 #
 # Copyright (c) by Shunsuke Ohira
 #   00.600 2022/05/09: For Pi400 (original)
@@ -48,21 +51,47 @@
 #   01.002 2023/09/19: Reduce global variable memory
 #   01.300 2023/09/19: Tones in the timbre can be selected from the other databank
 #   01.500 2023/09/21: MIDI channel can be assigned to each timbre portion
+#   01.600 2026/10/16: Zero heap allocation register write path
+#   01.601 2026/10/16: Shadow registers to skip redundant SPI writes
+#   01.602 2026/10/16: SPI register write queue flushed once per MIDI batch or score row
+#   01.700 2026/10/16: Integer voice engine (note numbers and bitmasks instead of note name strings)
+#   01.701 2026/10/16: Voice allocator with free lists and voice stealing policies
+#   01.702 2026/10/16: Tone slot decoupled from voice, overlapped portions share their voices
+#   01.703 2026/10/16: LRU tone slot cache, timbre change sends the tones not in YMF825 only
+#   01.704 2026/10/16: Prebuilt tone burst data of recently used timbres
+#   01.705 2026/10/16: Tone slot sound parameters in one preallocated burst buffer
+#   01.706 2026/10/16: Shadow tone slots to skip tone uploads not changing YMF825
+#   01.707 2026/10/16: MIDI channel to timbre portion routing table with key ranges
+#   01.708 2026/10/16: YMF825 reset waits can be awaited (turn_on_synthesizer_steps)
+#   01.709 2026/10/16: Databanks in an indexed binary archive (YMF825Bank.bin) instead of JSON text files
+#   01.710 2026/10/16: LRU cache of the tones in the other databanks
+#   01.711 2026/10/16: Name index of all databanks
+#   01.712 2026/10/16: Record level saves of a tone, timbre, equalizer or name through the databank journal
+#   01.713 2026/10/16: Tone and equalizer bursts as steps (*_steps()) to wait for YMF825 without blocking
+#   01.714 2026/10/16: Find a timbre using a tone (to send the timbre again after the tone changed)
+#   01.715 2026/10/16: JSON text file names of the constructor are used to make the databank archive
+#   01.716 2026/10/16: Databank transaction is aborted when a save fails
+#   01.717 2026/10/16: Record saves in steps (*_steps()) for the engine to run between
+#   01.718 2026/10/16: Key off writes the tone slot keyed on by the voice
+#   01.719 2026/10/16: Voice pools and MIDI routes are built again when timbres are loaded
+#   01.720 2026/10/16: Broken JSON text files are reported when the databank archive is made
 ##################################################################################
 
 from machine import Pin, SPI
 import time
-import json
 import re
+import gc
+from array import array
 #from decimal import Decimal
 import math
+from ymf825pico_databank import databank_archive_class, make_equalizer_frame, json_to_archive, decode_name, encode_name, NAME_TONE, NAME_TIMBRE, NAME_EQUALIZER
 
 
 ## YMF825 hardware control class for Raspberry Pi PICO W ##
 class ymf825pico_class:
 
     # Initializer
-    def __init__( self, file_tone_name = "YMF825ToneName.txt", file_tone_param = "YMF825ToneParm.txt", file_timbre_name = "YMF825TimbreName.txt", file_timbre_param = "YMF825TimbreParm.txt", file_equalizer_name = "YMF825EQName.txt", file_equalizer_param = "YMF825EQParm.txt", file_encode = "utf-8" ):
+    def __init__( self, file_tone_name = "YMF825ToneName.txt", file_tone_param = "YMF825ToneParm.txt", file_timbre_name = "YMF825TimbreName.txt", file_timbre_param = "YMF825TimbreParm.txt", file_equalizer_name = "YMF825EQName.txt", file_equalizer_param = "YMF825EQParm.txt", file_encode = "utf-8", file_databank = "YMF825Bank.bin" ):
         # PICO GPIO and pin no.
         self.SPI_CH = 0
         self.SPIPORT_MOSI = 19    # pin25
@@ -77,6 +106,24 @@ class ymf825pico_class:
         self.spi_cs = Pin(self.SPIPORT_CE, Pin.OUT)
         self.spi = SPI(self.SPI_CH, sck=Pin(self.SPIPORT_CLK), mosi=Pin(self.SPIPORT_MOSI), miso=Pin(self.SPIPORT_MISO), baudrate=self.SPI_MAX_SPEED_HZ, firstbit=SPI.MSB, polarity=0, phase=0)
 
+        # SPI scratch buffers (preallocated, never allocate heap while writing registers)
+        self.spi_reg_buf = bytearray(2)                       # [address, data] for a single register write
+        self.spi_tone_buf = bytearray(36)                     # [address|data(35byte)] for one tone burst write (0x07)
+        self.NOTE_FRAME_REGS = (0x0B, 0x0C, 0x0D, 0x0E, 0x0F) # Registers written by note on/off
+        self.spi_note_buf = bytearray(len(self.NOTE_FRAME_REGS) * 2)
+        for r in range(len(self.NOTE_FRAME_REGS)):
+            self.spi_note_buf[r * 2] = self.NOTE_FRAME_REGS[r]
+        self.spi_note_mv = memoryview(self.spi_note_buf)
+        self.spi_note_frames = [self.spi_note_mv[r * 2:r * 2 + 2] for r in range(len(self.NOTE_FRAME_REGS))]
+
+        # SPI register write queue (between begin_spi_queue() and end_spi_queue())
+        self.SPI_QUEUE_FRAMES = 64                            # Frames in the queue, the queue is flushed when full
+        self.spi_queue_buf = bytearray(self.SPI_QUEUE_FRAMES * 2)
+        self.spi_queue_mv = memoryview(self.spi_queue_buf)
+        self.spi_queue_frames = [self.spi_queue_mv[f * 2:f * 2 + 2] for f in range(self.SPI_QUEUE_FRAMES)]
+        self.spi_queue_len = 0                                # Frames queued
+        self.spi_queue_depth = 0                              # Nesting level of begin_spi_queue(), 0 means immediate mode
+
         # YMF825 RESET pin
         self.YMF825_reset = Pin(self.YMF825_RESET, Pin.OUT)
 
@@ -234,21 +281,55 @@ class ymf825pico_class:
         }
         
         # Sustain pedal control
-        self.NO_SUSTAIN      = 0                              # Sustain pedal is released
-        self.WILL_BE_SUSTAIN = 1                              # Sustain pedal was pressed while note on
-        self.IN_SUSTAIN      = 2                              # Note off but sustain pedal is pressed
-        self.sustain_pressed = -1;                            # True while sustain pedal is pressed, otherwise False
+        self.sustain_pressed = -1;                            # Timbre portion while sustain pedal is pressed, otherwise -1
 
         # YMF825 Voices.
         self.VOICES = 16                                      # Maximum voices
-        self.synth_voices  = [""] * self.VOICES               # Playing note like "C4" or "C4#" each voice, voices are spearated 4-timbres.
-        self.synth_volumes = [0] * self.VOICES                # Playing note volume (0..31) each voice
-        self.synth_sustain = [self.NO_SUSTAIN] * self.VOICES  # Sustain pedal status for each voice
+        self.NOTES = 128                                      # Note numbers (0..127)
+        self.NO_NOTE = 0xFF                                   # Not playing mark in the voice arrays
+        self.voice_notes   = bytearray([self.NO_NOTE] * self.VOICES)  # Playing note number each voice
+        self.voice_portion = bytearray([self.NO_NOTE] * self.VOICES)  # Timbre portion playing each voice
+        self.voice_tone_slot = bytearray(range(self.VOICES))  # YMF825 tone slot keyed on by each voice (for key off)
+        self.synth_volumes = bytearray(self.VOICES)           # Playing note volume (0..31) each voice
+        self.voice_active = 0                                 # Bitmask of voices playing a note (key on or in sustain)
+        self.voice_will_sustain = 0                           # Bitmask of voices key on while sustain pedal is pressed
+        self.voice_in_sustain = 0                             # Bitmask of voices key off but sustain pedal is pressed
 #        self.synth_sounds = [[[0]*36]] * self.VOICES          # Sound parameters each voice
-        self.synth_sounds = [bytearray(36)] * self.VOICES       # Sound parameters each voice
+        self.TONE_SLOTS = 16                                  # Tone slots in YMF825
+        self.synth_sound_buf = bytearray(2 + 30 * self.TONE_SLOTS + 4)  # [address|header|tone(30byte) * TONE_SLOTS|trailer] for tone burst write (0x07)
+        self.synth_sound_mv = memoryview(self.synth_sound_buf)
+        self.synth_sounds = [self.synth_sound_mv[2 + t * 30:2 + t * 30 + 30] for t in range(self.TONE_SLOTS)]  # Sound parameters (30byte) each tone slot
+        self.TONE_BURST_TRAILER = b'\x80\x03\x81\x80'
+        self.tone_burst_hold = bytearray(4)                   # Sound parameters under the trailer while sending a part of tone slots
+        self.tone_chip_buf = bytearray(30 * self.TONE_SLOTS)  # Shadow copy of the sound parameters in YMF825 each tone slot
+        self.tone_chip_valid = 0                              # Bitmask of tone slots having known data in tone_chip_buf
+        self.tone_uploads = 0                                 # Tone burst writes sent
+        self.tone_uploads_skipped = 0                         # Tone burst writes skipped by the shadow tone slots
+        self.tone_slot_key = array('h', [-1] * self.TONE_SLOTS)  # databank * TONES + tone in each tone slot (-1: empty)
+        self.tone_slot_used = array('i', [0] * self.TONE_SLOTS)  # Time stamp (serial number) of the last use each tone slot
+        self.tone_slot_stamp = 0
+        self.tone_cache_hits = 0                              # Tones found in the tone slots
+        self.tone_cache_misses = 0                            # Tones sent to the tone slots
+
+        # Prebuilt tone burst data of recently used timbres.
+        self.TIMBRE_BLOBS = 4                                 # Timbres having prebuilt burst data
+        self.timbre_blob_timbre = array('h', [-1] * self.TIMBRE_BLOBS)  # Timbre index each blob (-1: empty)
+        self.timbre_blob = [None] * self.TIMBRE_BLOBS         # [address|header|tone(30byte) * slots|trailer]
+        self.timbre_blob_keys = [None] * self.TIMBRE_BLOBS    # databank * TONES + tone in each tone slot in the blob
+        self.timbre_blob_slots = [None] * self.TIMBRE_BLOBS   # Tone slot of each timbre portion
+        self.timbre_blob_used = array('i', [0] * self.TIMBRE_BLOBS)     # Time stamp of the last use each blob
+        self.timbre_blob_hits = 0                             # Timbre changes sent by a prebuilt blob
         self.synth_sel_voices = list(range(0,self.VOICES+1))  # Number of voices to assign each timbre portion
         self.synth_sel_volume = list(range(0,32))             # Voice volume (0..31)
 
+        # Shadow copy of the YMF825 write-only registers (-1: unknown, the next write is never skipped)
+        #   [0x00..0x1F]: control registers
+        #   [SHADOW_VOICE_BASE + voice * 8 + (address - 0x0C)]: voice registers 0x0C..0x13 selected by 0x0B
+        self.SHADOW_VOICE_BASE = 0x20
+        self.reg_shadow = array('h', [-1] * (self.SHADOW_VOICE_BASE + self.VOICES * 8))
+        self.spi_writes = 0                                   # SPI register writes sent
+        self.spi_writes_saved = 0                             # SPI register writes skipped by the shadow
+
         # Databank number (0..9)
         self.DATABANK_MAX = 10                                # Databank is a set of TIMBREs, TONEs and EQs
         self.DATABANK = 0                                     # Databank is a set of TIMBREs, TONEs and EQs
@@ -264,6 +345,36 @@ class ymf825pico_class:
         self.TIMBRES = 20                                   # Maximum timbres
         self.TIMBRE_PORTIONS = 4                            # Maximum portions in timbre
         self.synth_play_timbre = 0                          # Playing timbre index
+        self.portion_note_voice = bytearray([self.NO_NOTE] * (self.TIMBRE_PORTIONS * self.NOTES))  # [portion * NOTES + note] = voice
+        self.portion_tone_slot = bytearray(range(self.TIMBRE_PORTIONS))  # YMF825 tone slot of each timbre portion
+
+        # Voice allocator.
+        #   Each voice pool has a FIFO free list of voices not playing,
+        #   a released voice is appended to the tail, so the voice released longest ago is used first.
+        self.STEAL_OLDEST = 0                               # Steal the voice played first
+        self.STEAL_QUIETEST = 1                             # Steal the voice having the lowest volume
+        self.STEAL_RELEASED_FIRST = 2                       # Steal a voice key off but sounding by sustain pedal first
+        self.STEAL_SAME_NOTE = 3                            # Retrigger the voice playing the same note, otherwise steal the oldest
+        self.voice_steal_policy = self.STEAL_OLDEST
+        self.VOICE_POOLS = self.TIMBRE_PORTIONS             # A voice pool for each timbre portion
+        self.portion_pool = bytearray(range(self.TIMBRE_PORTIONS))            # Voice pool of each timbre portion (NO_NOTE: no voice)
+        self.voice_pool = bytearray([self.NO_NOTE] * self.VOICES)             # Voice pool of each voice
+        self.pool_members = [0] * self.VOICE_POOLS                            # Bitmask of voices in each pool
+        self.pool_free = bytearray(self.VOICE_POOLS * self.VOICES)            # FIFO free list (ring buffer) of each pool
+        self.pool_free_head = bytearray(self.VOICE_POOLS)
+        self.pool_free_count = bytearray(self.VOICE_POOLS)
+        self.voice_free = 0                                 # Bitmask of voices in the free lists
+        self.voice_released = 0                             # Bitmask of voices key off (may be sounding the release)
+        self.voice_last_note = bytearray([self.NO_NOTE] * self.VOICES)        # Note played last each voice
+        self.voice_on_stamp = array('i', [0] * self.VOICES) # Note on time stamp (note on serial number) each voice
+        self.note_on_stamp = 0
+
+        # MIDI channel routing (built by build_midi_routes()).
+        self.MIDI_CHANNELS = 16
+        self.midi_routes = [()] * self.MIDI_CHANNELS        # Timbre portions playing each MIDI channel (0..15)
+        self.midi_route_offset = 0                          # Timbre portion shift of the routes
+        self.portion_key_from = bytearray(self.TIMBRE_PORTIONS)                      # Lowest note played by each timbre portion
+        self.portion_key_to = bytearray([self.NOTES - 1] * self.TIMBRE_PORTIONS)     # Highest note played by each timbre portion
         self.synth_timbre_names = ["NoName"] * self.TIMBRES # Timbre names list
         self.synth_timbres = [[                             # YMF825 voice number (from-to) and its tone index for each timbre [Timber List][Timber Postion][from to]
                                 {"voice_from":  0, "voice_to": 15, "databank": 0, "tone": 0, "volume": 31, "midi_ch": 1},
@@ -282,7 +393,7 @@ class ymf825pico_class:
                                             {"ceq0": 1, "ceq1": 0, "ceq2": 0, "ceq3": 0, "ceq4": 0}
                                         ]] * self.EQUALIZERS
 
-        # Files
+        # Files (the JSON text files are converted to the databank archive if it does not exist)
         self.tone_name_file = file_tone_name
         self.tone_param_file= file_tone_param
         self.timbre_name_file = file_timbre_name
@@ -290,10 +401,31 @@ class ymf825pico_class:
         self.equalizer_name_file = file_equalizer_name
         self.equalizer_param_file = file_equalizer_param
         self.file_encode = file_encode
-        
+        self.databank_archive = databank_archive_class( file_databank, self.DATABANK_MAX, self.TONES, self.TIMBRES, self.EQUALIZERS, self.TIMBRE_PORTIONS )
+        self.databank_tone = bytearray(self.databank_archive.TONE_BYTES)
+
+        # Name index of all databanks: the name section of each databank read on the first use
+        self.NAME_BYTES = self.databank_archive.NAME_BYTES
+        self.NAME_SECTION_BYTES = self.databank_archive.NAME_SECTION_BYTES
+        self.name_index = bytearray(self.DATABANK_MAX * self.NAME_SECTION_BYTES)
+        self.name_index_mv = memoryview(self.name_index)
+        self.name_index_loaded = 0                            # Bitmask of the databanks in the name index
+
+        # LRU cache of the tones read from the other databanks (the current databank tones are in synth_tones)
+        self.set_bank_tone_cache_size( 1200 )
+
         # Equalizer parameters buffer (address + 15bytes)
         self.equalizer_ceq = bytearray(16)
 
+        # CEQ register data of the 3 equalizers each equalizer setting (read from the databank)
+        self.EQ_FRAMES_BYTES = 3 * 16
+        self.synth_equalizer_frames = bytearray(self.EQUALIZERS * self.EQ_FRAMES_BYTES)
+        self.synth_equalizer_frames_mv = memoryview(self.synth_equalizer_frames)
+
+        # Shadow copy of the equalizer parameters written to YMF825 (0x20..0x22)
+        self.equalizer_shadow = [bytearray(16) for e in range(3)]
+        self.equalizer_shadow_valid = bytearray(3)
+
 
     # LED indicator.
     #   onoff:: True:turn on, False: turn off
@@ -302,37 +434,195 @@ class ymf825pico_class:
 
 
     # Wait timer.
+    # Queued SPI writes are sent before waiting to keep the order of writes and waits.
     #   msec:: Waite time in milli-seconds
     def delay( self, msec ):
+        self.flush_spi_queue()
         time.sleep( msec/1000 )
 
 
+    # Run steps waiting by delay().
+    #   steps:: generator yielding the time (msec) to wait after each step (*_steps() methods)
+    def wait_steps( self, steps ):
+        for msec in steps:
+            self.delay( msec )
+
+
     # Set SPI Slave Select Pin (CE0).
     #   pinv:: GPIO.HIGH: not-select, GPIO.LOW: select
     def chip_select( self, sel ):
         self.spi_cs.value(0 if sel else 1)
 
 
-    # Write byte array data to SPI.
+    # Write byte array data to SPI (burst write).
     #   addr:: SPI register address
-    #   data_array: byte data in array
+    #   data_array: byte data in array, data_array[0] is a place holder of the address.
+    #               The place holder is restored after writing, so the caller's data is never changed.
     def spi_write( self, addr, data_array ):
-        self.chip_select(True)
+        self.flush_spi_queue()
+        holder = data_array[0]
         data_array[0] = addr
+        self.chip_select(True)
         self.spi.write(data_array)
         self.chip_select(False)
+        data_array[0] = holder
+
+
+    # Get index of a register in the shadow registers.
+    #   addr:: SPI register address
+    #
+    #   RETURN:: index in reg_shadow, -1 if the register must always be written
+    def shadow_index( self, addr ):
+        # Burst writes, sequencer reset and key on/off work by being written
+        if addr == 0x07 or addr == 0x08 or addr == 0x0F or addr >= self.SHADOW_VOICE_BASE:
+            return -1
+
+        # Voice registers of the voice selected by 0x0B
+        if addr >= 0x0C and addr <= 0x13:
+            voice = self.reg_shadow[0x0B]
+            if voice < 0:
+                return -1
+            return self.SHADOW_VOICE_BASE + (voice & 0x0f) * 8 + addr - 0x0C
+
+        return addr
+
+
+    # Forget all shadow registers, the next write to every register is sent to YMF825.
+    # Call this after YMF825 is reset.
+    def reset_register_shadow( self ):
+        for r in range(len(self.reg_shadow)):
+            self.reg_shadow[r] = -1
+
+        for e in range(len(self.equalizer_shadow_valid)):
+            self.equalizer_shadow_valid[e] = 0
+
+
+    # Get SPI register write statistics
+    #   RETURN:: (written, saved by the shadow registers)
+    def get_spi_write_stats( self ):
+        return (self.spi_writes, self.spi_writes_saved)
+
+
+    # Clear SPI register write statistics
+    def clear_spi_write_stats( self ):
+        self.spi_writes = 0
+        self.spi_writes_saved = 0
+
+
+    # Start queueing SPI register writes.
+    # Register writes are stored in the queue until end_spi_queue() is called,
+    # then they are sent in the same order.  Calls can be nested.
+    def begin_spi_queue( self ):
+        self.spi_queue_depth += 1
+
+
+    # End queueing SPI register writes and send the queued writes.
+    def end_spi_queue( self ):
+        if self.spi_queue_depth > 0:
+            self.spi_queue_depth -= 1
+
+        if self.spi_queue_depth == 0:
+            self.flush_spi_queue()
+
+
+    # Send all the queued SPI register writes.
+    def flush_spi_queue( self ):
+        if self.spi_queue_len == 0:
+            return
+
+        cs = self.spi_cs
+        spi = self.spi
+        frames = self.spi_queue_frames
+        for f in range(self.spi_queue_len):
+            cs.value(0)
+            spi.write(frames[f])
+            cs.value(1)
+
+        self.spi_queue_len = 0
+
+
+    # Put a register write into the queue.
+    #   addr:: SPI register address
+    #   byte_data: one byte data
+    def spi_queue_put( self, addr, byte_data ):
+        if self.spi_queue_len >= self.SPI_QUEUE_FRAMES:
+            self.flush_spi_queue()
+
+        f = self.spi_queue_len * 2
+        self.spi_queue_buf[f] = addr
+        self.spi_queue_buf[f + 1] = byte_data
+        self.spi_queue_len += 1
 
 
     # Write one byte data to SPI.
+    # The write is queued in the queueing mode except 0x07 and 0x08,
+    # these registers flush the queue and are written immediately.
     #   addr:: SPI register address
     #   byte_data: one byte data
-    def spi_write_byte( self, addr, byte_data ):
-        spi_byte_data = bytearray([addr, byte_data])
+    #   force:: True=write even if the shadow register has the same value
+    def spi_write_byte( self, addr, byte_data, force = False ):
+        shadow = self.shadow_index(addr)
+        if shadow >= 0:
+            if not force and self.reg_shadow[shadow] == byte_data:
+                self.spi_writes_saved += 1
+                return
+
+            self.reg_shadow[shadow] = byte_data
+
+        self.spi_writes += 1
+        if self.spi_queue_depth > 0 and addr != 0x07 and addr != 0x08:
+            self.spi_queue_put(addr, byte_data)
+            return
+
+        self.flush_spi_queue()
+        self.spi_reg_buf[0] = addr
+        self.spi_reg_buf[1] = byte_data
         self.chip_select(True)
-        self.spi.write(spi_byte_data)
+        self.spi.write(self.spi_reg_buf)
         self.chip_select(False)
 
 
+    # Write the note frame (0x0B..0x0F) prepared in spi_note_buf to SPI.
+    # Each register is sent in its own chip select frame by a preallocated memoryview slice
+    # (or queued in the queueing mode), registers having the same value in the shadow registers are skipped.
+    def spi_write_note_frame( self ):
+        frame = self.spi_note_buf
+        for r in range(len(self.spi_note_frames)):
+            shadow = self.shadow_index(frame[r * 2])
+            if shadow >= 0:
+                if self.reg_shadow[shadow] == frame[r * 2 + 1]:
+                    self.spi_writes_saved += 1
+                    continue
+
+                self.reg_shadow[shadow] = frame[r * 2 + 1]
+
+            self.spi_writes += 1
+            if self.spi_queue_depth > 0:
+                self.spi_queue_put(frame[r * 2], frame[r * 2 + 1])
+            else:
+                self.chip_select(True)
+                self.spi.write(self.spi_note_frames[r])
+                self.chip_select(False)
+
+
+    # Measure heap bytes allocated by note events (for debug).
+    #   voice:: voice to play
+    #   notes:: number of note on/off pairs to play
+    #
+    #   RETURN:: allocated bytes in total (0 is expected)
+    def measure_note_allocation( self, voice = 0, notes = 16 ):
+        gc.collect()
+        gc.disable()
+        used = gc.mem_alloc()
+        for s in range(60, 60 + notes):
+            self.note_on( voice, self.notenum_hi[s], self.notenum_lo[s] )
+            self.note_off( voice )
+
+        used = gc.mem_alloc() - used
+        gc.enable()
+        return used
+
+
     # Set YMF825 Chanel.
     def set_chanel( self ):
         self.spi_write_byte( 0x0F, 0x30 )       # Note on
@@ -345,30 +635,37 @@ class ymf825pico_class:
     # Note on (play a note).
     # NOTICE:: Never call this directory, use play_by_scale() or play_by_timbre_scale().
     #   fnumh, fnuml:: 2byte data to play, byte data for a note is in notenum_hi[note] and notenum_lo[note].
-    def note_on( self, voice, notenum_h, notenum_l, volume = 0x7c ):
+    #   tone:: YMF825 tone slot to play (0..15), -1: same number as the voice
+    def note_on( self, voice, notenum_h, notenum_l, volume = 0x7c, tone = -1 ):
 #        print("NOTE ON VOLUME =", str(volume))
         # Send note on to YMF825
-        self.spi_write_byte( 0x0B, voice & 0x0f )
-        self.spi_write_byte( 0x0C, volume & 0x7c )
-        self.spi_write_byte( 0x0D, notenum_h )
-        self.spi_write_byte( 0x0E, notenum_l )
-        self.spi_write_byte( 0x0F, 0x40 | (voice&0x0f) )
+        slot = (voice if tone < 0 else tone) & 0x0f
+        self.voice_tone_slot[voice] = slot
+        frame = self.spi_note_buf
+        frame[1] = voice & 0x0f                   # 0x0B
+        frame[3] = volume & 0x7c                  # 0x0C
+        frame[5] = notenum_h                      # 0x0D
+        frame[7] = notenum_l                      # 0x0E
+        frame[9] = 0x40 | slot                    # 0x0F
+        self.spi_write_note_frame()
 
         # LED
         self.led_turn( True )
 
 
     # Note off.
-    #   Turn off the note playing.
+    #   Turn off the note playing, ToneNum stays the tone slot keyed on while the note releases.
     def note_off( self, voice, volume = 0x54 ):
-        s = self.get_scale_number(self.synth_voices[voice])
-        if 0 <= s and s <= 127:
+        s = self.voice_notes[voice]
+        if s < self.NOTES:
 #            "STOP VOICE, SCALE:", voice,s)
-            self.spi_write_byte( 0x0B, voice & 0x0f )
-            self.spi_write_byte( 0x0C, volume & 0x7c )
-            self.spi_write_byte( 0x0D, self.notenum_hi[s] )
-            self.spi_write_byte( 0x0E, self.notenum_lo[s] )
-            self.spi_write_byte( 0x0F, 0x00 | (voice&0x0f) )
+            frame = self.spi_note_buf
+            frame[1] = voice & 0x0f               # 0x0B
+            frame[3] = volume & 0x7c              # 0x0C
+            frame[5] = self.notenum_hi[s]         # 0x0D
+            frame[7] = self.notenum_lo[s]         # 0x0E
+            frame[9] = 0x00 | self.voice_tone_slot[voice]   # 0x0F (the tone slot keyed on)
+            self.spi_write_note_frame()
         else:
             pass
 #            print("UNKNOWN STOP VOICE:[", voice, "]")
@@ -379,8 +676,9 @@ class ymf825pico_class:
 
     # All notes off
     def all_notes_off( self ):
-        for voice in list(range(self.VOICES)):
+        for voice in range(self.VOICES):
             self.note_off( voice )
+            self.release_voice( voice )
 
 
     # Get scale number in fnum_hi nd lo.
@@ -414,16 +712,257 @@ class ymf825pico_class:
         s = self.get_scale_number(scale)
         if 0 <= s and s <= 127:
 #            print("PLAY:", scale, "=", s, " ", play, "_", rest, "//")
-            self.synth_voices[0] = scale
+            self.voice_notes[0] = s
             self.note_on( 0, self.notenum_hi[s], self.notenum_lo[s] )
             self.delay( play )
             self.note_off( 0 )
+            self.voice_notes[0] = self.NO_NOTE
             self.delay( rest )
         else:
             pass
 #            print("Unknown scale:", scale)
 
 
+    # Set a voice playing a note.
+    #   voice:: voice number
+    #   timbre_portion:: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
+    #   note:: note number (0..127)
+    #   volume:: note volume (0..31)
+    def assign_voice( self, voice, timbre_portion, note, volume ):
+        self.voice_notes[voice] = note
+        self.voice_last_note[voice] = note
+        self.voice_portion[voice] = timbre_portion
+        self.synth_volumes[voice] = volume
+        self.portion_note_voice[timbre_portion * self.NOTES + note] = voice
+        self.voice_active |= 1 << voice
+        self.voice_released &= ~(1 << voice)
+        self.note_on_stamp += 1
+        self.voice_on_stamp[voice] = self.note_on_stamp
+
+
+    # Set a voice not playing, and put it into the free list.
+    #   voice:: voice number
+    def release_voice( self, voice ):
+        note = self.voice_notes[voice]
+        portion = self.voice_portion[voice]
+        if note != self.NO_NOTE and portion != self.NO_NOTE:
+            if self.portion_note_voice[portion * self.NOTES + note] == voice:
+                self.portion_note_voice[portion * self.NOTES + note] = self.NO_NOTE
+
+            self.voice_released |= 1 << voice
+
+        self.voice_notes[voice] = self.NO_NOTE
+        self.voice_portion[voice] = self.NO_NOTE
+        mask = ~(1 << voice)
+        self.voice_active &= mask
+        self.voice_will_sustain &= mask
+        self.voice_in_sustain &= mask
+        self.push_free_voice(voice)
+
+
+    # Set voice stealing policy.
+    #   policy:: STEAL_OLDEST, STEAL_QUIETEST, STEAL_RELEASED_FIRST or STEAL_SAME_NOTE
+    def set_voice_steal_policy( self, policy ):
+        if policy >= self.STEAL_OLDEST and policy <= self.STEAL_SAME_NOTE:
+            self.voice_steal_policy = policy
+
+
+    # Get voice stealing policy.
+    def get_voice_steal_policy( self ):
+        return self.voice_steal_policy
+
+
+    # Make the voice pools and their free lists for the playing timbre.
+    # A voice claimed by some portions belongs to the first portion.
+    def build_voice_pools( self ):
+        for pool in range(self.VOICE_POOLS):
+            self.pool_members[pool] = 0
+            self.pool_free_head[pool] = 0
+            self.pool_free_count[pool] = 0
+
+        for v in range(self.VOICES):
+            self.voice_pool[v] = self.NO_NOTE
+
+        # Portions having overlapped voice ranges share a pool
+        for portion in range(self.TIMBRE_PORTIONS):
+            vf = self.synth_timbres[self.synth_play_timbre][portion]["voice_from"]
+            vt = self.synth_timbres[self.synth_play_timbre][portion]["voice_to"]
+            if vf < 0 or vf > vt:
+                self.portion_pool[portion] = self.NO_NOTE
+                continue
+
+            members = 0
+            for v in range(vf, vt + 1):
+                members |= 1 << v
+
+            pool = portion
+            for p in range(portion):
+                if self.portion_pool[p] != self.NO_NOTE and (self.pool_members[self.portion_pool[p]] & members):
+                    if pool == portion:
+                        pool = self.portion_pool[p]
+                    elif self.portion_pool[p] != pool:
+                        # Merge the pool bridged by this portion
+                        merged = self.portion_pool[p]
+                        self.pool_members[pool] |= self.pool_members[merged]
+                        self.pool_members[merged] = 0
+                        for q in range(portion):
+                            if self.portion_pool[q] == merged:
+                                self.portion_pool[q] = pool
+
+            self.portion_pool[portion] = pool
+            self.pool_members[pool] |= members
+
+        self.voice_free = 0
+        for pool in range(self.VOICE_POOLS):
+            for v in range(self.VOICES):
+                if self.pool_members[pool] & (1 << v):
+                    self.voice_pool[v] = pool
+                    if not (self.voice_active & (1 << v)):
+                        self.push_free_voice(v)
+
+        # Portions having no voice are not routed
+        self.build_midi_routes()
+
+
+    # Build the MIDI channel to timbre portion routing table of the playing timbre.
+    # Call this when the playing timbre, its MIDI channels or key ranges, or the portion shift is changed.
+    #   offset:: timbre portion shift (a MIDI channel of portion p plays portion (p + offset) % TIMBRE_PORTIONS), -1: not changed
+    def build_midi_routes( self, offset = -1 ):
+        if offset >= 0:
+            self.midi_route_offset = offset % self.TIMBRE_PORTIONS
+
+        routes = [()] * self.MIDI_CHANNELS
+        for p in range(self.TIMBRE_PORTIONS):
+            target = (p + self.midi_route_offset) % self.TIMBRE_PORTIONS
+            ch = self.get_playing_timbre_midich(p) - 1
+            if ch >= 0 and ch < self.MIDI_CHANNELS and self.portion_pool[target] != self.NO_NOTE:
+                routes[ch] = routes[ch] + (target,)
+
+        self.midi_routes = routes
+        for p in range(self.TIMBRE_PORTIONS):
+            self.portion_key_from[p] = self.get_timbre_key_from(self.synth_play_timbre, p)
+            self.portion_key_to[p] = self.get_timbre_key_to(self.synth_play_timbre, p)
+
+
+    # Append a voice to the tail of the free list of its pool.
+    #   voice:: voice number
+    def push_free_voice( self, voice ):
+        pool = self.voice_pool[voice]
+        if pool == self.NO_NOTE or (self.voice_free & (1 << voice)):
+            return
+
+        tail = (self.pool_free_head[pool] + self.pool_free_count[pool]) % self.VOICES
+        self.pool_free[pool * self.VOICES + tail] = voice
+        self.pool_free_count[pool] += 1
+        self.voice_free |= 1 << voice
+
+
+    # Take a voice from the head of the free list.
+    #   pool:: voice pool
+    #
+    #   RETURN:: voice number, -1 if the free list is empty
+    def pop_free_voice( self, pool ):
+        if self.pool_free_count[pool] == 0:
+            return -1
+
+        head = self.pool_free_head[pool]
+        voice = self.pool_free[pool * self.VOICES + head]
+        self.pool_free_head[pool] = (head + 1) % self.VOICES
+        self.pool_free_count[pool] -= 1
+        self.voice_free &= ~(1 << voice)
+        return voice
+
+
+    # Take a voice out of the middle of the free list.
+    #   pool:: voice pool
+    #   voice:: voice number in the free list
+    def take_free_voice( self, pool, voice ):
+        base = pool * self.VOICES
+        head = self.pool_free_head[pool]
+        count = self.pool_free_count[pool]
+        found = False
+        for i in range(count):
+            pos = (head + i) % self.VOICES
+            if found:
+                self.pool_free[base + (pos - 1) % self.VOICES] = self.pool_free[base + pos]
+            elif self.pool_free[base + pos] == voice:
+                found = True
+
+        if found:
+            self.pool_free_count[pool] = count - 1
+            self.voice_free &= ~(1 << voice)
+
+
+    # Choose a voice to steal in a pool by the voice stealing policy.
+    #   pool:: voice pool
+    #
+    #   RETURN:: voice number, -1 if there is no voice in the pool
+    def choose_steal_voice( self, pool ):
+        members = self.pool_members[pool] & self.voice_active
+        policy = self.voice_steal_policy
+        victim = -1
+        for v in range(self.VOICES):
+            if not (members & (1 << v)):
+                continue
+
+            if victim < 0:
+                victim = v
+
+            elif policy == self.STEAL_QUIETEST and self.synth_volumes[v] != self.synth_volumes[victim]:
+                if self.synth_volumes[v] < self.synth_volumes[victim]:
+                    victim = v
+
+            elif policy == self.STEAL_RELEASED_FIRST and ((self.voice_in_sustain >> v) & 1) != ((self.voice_in_sustain >> victim) & 1):
+                if self.voice_in_sustain & (1 << v):
+                    victim = v
+
+            elif self.voice_on_stamp[v] < self.voice_on_stamp[victim]:
+                victim = v
+
+        return victim
+
+
+    # Get voice number playing a note in timbre.
+    #   timbre_portion:: Multi-Timbre index (0..3).
+    #   note:: note number (0..127)
+    #   play:: True: find a voice not playing if the note is not played, False: find the note only.
+    #
+    #   RETURN:: voice number, -1 if there is no voice
+    def get_voice_for_note( self, timbre_portion, note, play=True ):
+        v = self.portion_note_voice[timbre_portion * self.NOTES + note]
+        if v != self.NO_NOTE:
+            return v
+
+        if not play:
+            return -1
+
+        pool = self.portion_pool[timbre_portion]
+        if pool == self.NO_NOTE:
+            return -1
+
+        # Same note is sounding its release in the pool
+        if self.voice_steal_policy == self.STEAL_SAME_NOTE:
+            same = self.voice_free & self.voice_released & self.pool_members[pool]
+            for v in range(self.VOICES):
+                if (same & (1 << v)) and self.voice_last_note[v] == note:
+                    self.take_free_voice(pool, v)
+                    return v
+
+        # A voice not playing
+        v = self.pop_free_voice(pool)
+        if v >= 0:
+            return v
+
+        #There is no voice not playing, steal a voice
+        v = self.choose_steal_voice(pool)
+        if v >= 0:
+            self.note_off(v)
+            self.release_voice(v)
+            v = self.pop_free_voice(pool)
+
+        return v
+
+
     # Get voice number playing new note in timbre.
     #   timbre_portion:: Multi-Timbre index (0..3).
     #   scale:: "C4", "D5#", "F2", and so on. From "C0" to "G9".
@@ -431,20 +970,11 @@ class ymf825pico_class:
     #
     #   RETURN:: voice number
     def get_voice_in_timbre( self, timbre_portion, scale, play=True ):
-        v = -1
-        if timbre_portion >= 0 and timbre_portion < self.TIMBRE_PORTIONS and self.synth_timbres[self.synth_play_timbre][timbre_portion]["voice_from"] >= 0:
-            for i in range(self.synth_timbres[self.synth_play_timbre][timbre_portion]["voice_from"], self.synth_timbres[self.synth_play_timbre][timbre_portion]["voice_to"]+1):
-                if self.synth_voices[i] == scale:
-                    return i
-                if play and self.synth_voices[i] == "":
-                    v = i
-
-        #There is no voice not playing, use "first-voice" in the tmbre
-        if v == -1 and play:
-            v = self.synth_timbres[self.synth_play_timbre][timbre_portion]["voice_to"]
-            self.note_off(v)
+        s = self.get_scale_number(scale)
+        if s < 0 or s >= self.NOTES or timbre_portion < 0 or timbre_portion >= self.TIMBRE_PORTIONS:
+            return -1
 
-        return v
+        return self.get_voice_for_note( timbre_portion, s, play )
 
 
     #Get a note string ("C4", "D#3", ...) of note number (60-->"C4")
@@ -463,30 +993,7 @@ class ymf825pico_class:
     #
     #   RETURN:: voice number
     def play_by_timbre_scale( self, timbre_portion, scale ):
-        v = self.get_voice_in_timbre( timbre_portion, scale, True )
-        if v >= 0 and self.synth_voices[v] != scale:
-            s = self.get_scale_number(scale)
-    
-            if 0 <= s and s <= 127:
-                volume = self.synth_timbres[self.synth_play_timbre][timbre_portion]["volume"]
-                print("PLAY:", self.synth_play_timbre, self.synth_timbre_names[self.synth_play_timbre], timbre_portion, self.synth_tone_names[self.synth_timbres[self.synth_play_timbre][timbre_portion]["tone"]], ":", scale, "=", s, v, "vol =", volume)
-                self.note_on( v, self.notenum_hi[s], self.notenum_lo[s], volume << 2 )
-                self.synth_voices[v] = scale
-                self.synth_volumes[v] = volume
-                        
-                # Sustain pedal
-                if self.sustain_pressed == timbre_portion:
-                    self.synth_sustain[v] = self.WILL_BE_SUSTAIN
-
-#            print("VOICES=",synth_voices)
-            else:
-                pass
-#                print("Unknown play scale:", scale)
-        else:
-            pass
-#            print("No start voice:", self.synth_play_timbre, timbre_portion, scale)
-
-        return v
+        return self.play_by_timbre_scale_velocity( timbre_portion, scale, 127 )
 
 
     # Play by a scale name, call stop_by_timbre_scale() to turn off the scale.
@@ -495,38 +1002,12 @@ class ymf825pico_class:
     #
     #   RETURN:: voice number
     def play_by_timbre_scale_velocity( self, timbre_portion, scale, velocity ):
-        v = self.get_voice_in_timbre( timbre_portion, scale, True )
-#        print("PLAY: portion, scale, v=", timbre_portion, scale, v)
-        if v >= 0 and self.synth_voices[v] != scale:
-            s = self.get_scale_number(scale)
-    
-            if 0 <= s and s <= 127:
-                # Inerite sustain pedal if the timbre portion is changed
-                if self.sustain_pressed != -1:
-                    self.sustain_pressed = timbre_portion
-                
-                # Note on
-                volume = self.synth_timbres[self.synth_play_timbre][timbre_portion]["volume"]
-                volume = math.floor(volume * velocity / 127)
-#                print("PLAY:", self.synth_play_timbre, self.synth_timbre_names[self.synth_play_timbre], timbre_portion, self.synth_tone_names[self.synth_timbres[self.synth_play_timbre][timbre_portion]["tone"]], ":", scale, "=", s, v, "vol =", volume)
-#                print("PLAY: T,TN, P, B, T=", self.synth_play_timbre, self.synth_timbre_names[self.synth_play_timbre], timbre_portion, self.synth_timbres[self.synth_play_timbre][timbre_portion]["databank"], self.synth_timbres[self.synth_play_timbre][timbre_portion]["tone"], ":", scale, "=", s, v, "vol =", volume)
-                self.note_on( v, self.notenum_hi[s], self.notenum_lo[s], volume << 2 )
-                self.synth_voices[v] = scale
-                self.synth_volumes[v] = volume
-                        
-                # Sustain pedal
-                if self.sustain_pressed == timbre_portion:
-                    self.synth_sustain[v] = self.WILL_BE_SUSTAIN
-
-#            print("VOICES=",synth_voices)
-            else:
-                pass
-#                print("Unknown play scale:", scale)
-        else:
-            pass
-#            print("No start voice:", self.synth_play_timbre, timbre_portion, scale)
+        s = self.get_scale_number(scale)
+        if s < 0:
+            return -1
+#            print("Unknown play scale:", scale)
 
-        return v
+        return self.play_by_timbre_note( timbre_portion, s, velocity )
 
 
     #  timbre_portion:: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
@@ -534,41 +1015,77 @@ class ymf825pico_class:
     #
     #  RETURN:: voice number
     def play_by_timbre_note(self, timbre_portion, scale, velocity):
-        return self.play_by_timbre_scale_velocity(timbre_portion, self.get_note_scale(scale), velocity)
-    
+        if scale < 0 or scale >= self.NOTES or timbre_portion < 0 or timbre_portion >= self.TIMBRE_PORTIONS:
+            return -1
 
-    # Stop a scale in the timbre.
-    #   timbre_portion: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
-    #   scale:: "C4", "D5#", "F2", and so on. From "C0" to "G9".
-    def stop_by_timbre_scale( self, timbre_portion, scale ):
-        v = self.get_voice_in_timbre( timbre_portion, scale, False )
-    
+        # The note is playing
+        v = self.portion_note_voice[timbre_portion * self.NOTES + scale]
+        if v != self.NO_NOTE:
+            if self.voice_steal_policy != self.STEAL_SAME_NOTE:
+                return v
+
+            # Retrigger the voice
+            self.note_off( v, self.synth_volumes[v] << 2 )
+            self.release_voice( v )
+
+        v = self.get_voice_for_note( timbre_portion, scale, True )
+#        print("PLAY: portion, scale, v=", timbre_portion, scale, v)
         if v >= 0:
-            volume = self.synth_timbres[self.synth_play_timbre][timbre_portion]["volume"]
-            volume = self.synth_volumes[v]
+            # Inerite sustain pedal if the timbre portion is changed
+            if self.sustain_pressed != -1:
+                self.sustain_pressed = timbre_portion
             
-            # Sustail pedal
-            if self.synth_sustain[v] == self.WILL_BE_SUSTAIN:
-#                print("SUSTAIN:", timbre_portion, scale, "=", v, "vol =", volume)
-                self.synth_sustain[v] = self.IN_SUSTAIN
+            # Note on
+            volume = self.synth_timbres[self.synth_play_timbre][timbre_portion]["volume"]
+            volume = volume * velocity // 127
+#            print("PLAY: T, P, B, T=", self.synth_play_timbre, timbre_portion, self.synth_timbres[self.synth_play_timbre][timbre_portion]["databank"], self.synth_timbres[self.synth_play_timbre][timbre_portion]["tone"], ":", scale, v, "vol =", volume)
+            self.note_on( v, self.notenum_hi[scale], self.notenum_lo[scale], volume << 2, self.portion_tone_slot[timbre_portion] )
+            self.assign_voice( v, timbre_portion, scale, volume )
+                    
+            # Sustain pedal
+            if self.sustain_pressed == timbre_portion:
+                self.voice_will_sustain |= 1 << v
 
-            # Sustail pedal is released
-            else:
-#                print("STOP:", timbre_portion, scale, "=", v, "vol =", volume)
-                self.note_off( v, volume << 2 )
-                self.synth_voices[v] = ""
-                
-#        print("VOICES=", synth_voices)
         else:
             pass
-#            print("Unknown stop voice:", self.synth_play_timbre, timbre_portion, scale)
+#            print("No start voice:", self.synth_play_timbre, timbre_portion, scale)
+
+        return v
+    
+
+    # Stop a scale in the timbre.
+    #   timbre_portion: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
+    #   scale:: "C4", "D5#", "F2", and so on. From "C0" to "G9".
+    def stop_by_timbre_scale( self, timbre_portion, scale ):
+        s = self.get_scale_number(scale)
+        if s >= 0:
+            self.stop_by_timbre_note( timbre_portion, s )
 
 
     #Stop a scale in the timbre.
     #  timbre_portion: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
     #  scale:: 60 = "C4", "From "C0" to "G9".
     def stop_by_timbre_note(self, timbre_portion, scale):
-        self.stop_by_timbre_scale(timbre_portion, self.get_note_scale(scale))
+        if scale < 0 or scale >= self.NOTES or timbre_portion < 0 or timbre_portion >= self.TIMBRE_PORTIONS:
+            return
+
+        v = self.portion_note_voice[timbre_portion * self.NOTES + scale]
+        if v == self.NO_NOTE:
+            return
+#            print("Unknown stop voice:", self.synth_play_timbre, timbre_portion, scale)
+
+        # Sustail pedal
+        bit = 1 << v
+        if self.voice_will_sustain & bit:
+#            print("SUSTAIN:", timbre_portion, scale, "=", v)
+            self.voice_will_sustain &= ~bit
+            self.voice_in_sustain |= bit
+
+        # Sustail pedal is released
+        else:
+#            print("STOP:", timbre_portion, scale, "=", v)
+            self.note_off( v, self.synth_volumes[v] << 2 )
+            self.release_voice( v )
 
 
     #Set sutain pedal status
@@ -579,41 +1096,127 @@ class ymf825pico_class:
 
         # Sustain pedal was pressed --> set sustain to playing voice in the timbre portion
         if status:
-            for v in list(range(self.synth_timbres[self.synth_play_timbre][timbre_portion]["voice_from"], self.synth_timbres[self.synth_play_timbre][timbre_portion]["voice_to"]+1)):
-                if self.synth_voices[v] != "":
-                    self.synth_sustain[v] = self.WILL_BE_SUSTAIN
-#                    print("WILL_BE_SUSTAIN:", self.synth_voices[v])
+            for v in range(self.VOICES):
+                if self.voice_portion[v] == timbre_portion:
+                    self.voice_will_sustain |= (1 << v) & self.voice_active & ~self.voice_in_sustain
         
         # Sustain pedal was released --> note off the notes in sustain mode (all timbres)
         else:
-            for tp in list(range(0, self.TIMBRE_PORTIONS)):
-                for v in list(range(self.synth_timbres[self.synth_play_timbre][tp]["voice_from"], self.synth_timbres[self.synth_play_timbre][tp]["voice_to"]+1)):
-                    if self.synth_voices[v] != "":
-                        if self.synth_sustain[v] == self.IN_SUSTAIN:
-                            self.stop_by_timbre_scale(tp, self.synth_voices[v])
-#                            print("STOP SUSTAIN:", self.synth_voices[v])
-                    
-                        self.synth_sustain[v] = self.NO_SUSTAIN
+            sustained = self.voice_in_sustain
+            self.voice_will_sustain = 0
+            self.voice_in_sustain = 0
+            for v in range(self.VOICES):
+                if sustained & (1 << v):
+#                    print("STOP SUSTAIN:", v)
+                    self.note_off( v, self.synth_volumes[v] << 2 )
+                    self.release_voice( v )
         
 
     # Send sound data to YMF825.
     #   timbre_portion: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
-    def send_sound_to_YMF825( self, timbre ):
-        all_sound_param = bytearray(self.synth_sounds[0][0:32])         # address + voices + prams
-        for v in range(1,self.VOICES):                       # params * VOICES
-            all_sound_param += bytearray(self.synth_sounds[v][2:32])
-        all_sound_param += bytearray(self.synth_sounds[0][32:])         # trailer
+    #   slots:: number of tone slots to send from slot 0 (burst write always starts at slot 0)
+    def send_sound_to_YMF825( self, timbre, slots = -1 ):
+        self.wait_steps( self.send_sound_to_YMF825_steps( timbre, slots ) )
+
+
+    # Send sound data to YMF825 steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   timbre_portion: Multi-Timbre portion index (0..TIMBRE_PORTIONS)
+    #   slots:: number of tone slots to send from slot 0 (burst write always starts at slot 0)
+    def send_sound_to_YMF825_steps( self, timbre, slots = -1 ):
+        if slots < 0:
+            slots = self.TONE_SLOTS
+
+        # Send the tone slots up to the last slot changed only
+        while slots > 0 and self.is_tone_slot_in_chip( slots - 1, self.synth_sounds[slots - 1] ):
+            slots -= 1
+
+        if slots == 0:
+            self.tone_uploads_skipped += 1
+            return
 
-        #Burst write mode
 #        print("YMF825 Burst write mode: ", timbre)
+        n = self.make_tone_burst( slots )
+        yield from self.send_tone_burst_steps( self.synth_sound_mv[0:n] )
+        self.clear_tone_burst( slots )
+        self.tone_uploads += 1
+        for t in range(slots):
+            self.set_tone_slot_in_chip( t, self.synth_sounds[t] )
+
+
+    # Compare sound parameters with the shadow tone slot.
+    #   slot:: tone slot
+    #   sound:: sound parameters (30byte)
+    #
+    #   RETURN:: True: YMF825 has the same parameters in the slot
+    def is_tone_slot_in_chip( self, slot, sound ):
+        if not (self.tone_chip_valid & (1 << slot)):
+            return False
+
+        base = slot * 30
+        for b in range(30):
+            if self.tone_chip_buf[base + b] != sound[b]:
+                return False
+
+        return True
+
+
+    # Set sound parameters sent to a tone slot in the shadow tone slots.
+    #   slot:: tone slot
+    #   sound:: sound parameters (30byte)
+    def set_tone_slot_in_chip( self, slot, sound ):
+        base = slot * 30
+        for b in range(30):
+            self.tone_chip_buf[base + b] = sound[b]
+        self.tone_chip_valid |= 1 << slot
+
+
+    # Get tone upload statistics
+    #   RETURN:: (sent, skipped by the shadow tone slots)
+    def get_tone_upload_stats( self ):
+        return (self.tone_uploads, self.tone_uploads_skipped)
+
+
+    # Clear tone upload statistics
+    def clear_tone_upload_stats( self ):
+        self.tone_uploads = 0
+        self.tone_uploads_skipped = 0
+
+
+    # Make tone burst data of the tone slots in synth_sound_buf.
+    # The trailer is put just after the last slot, call clear_tone_burst() after using the data.
+    #   slots:: number of tone slots from slot 0
+    #
+    #   RETURN:: length of the burst data
+    def make_tone_burst( self, slots ):
+        buf = self.synth_sound_buf
+        buf[1] = 0x80 + slots                                # header: number of tones
+        n = 2 + slots * 30
+        for b in range(4):                                   # trailer
+            self.tone_burst_hold[b] = buf[n + b]
+            buf[n + b] = self.TONE_BURST_TRAILER[b]
+        return n + 4
+
+
+    # Put back the sound parameters under the trailer made by make_tone_burst().
+    #   slots:: number of tone slots from slot 0
+    def clear_tone_burst( self, slots ):
+        n = 2 + slots * 30
+        for b in range(4):
+            self.synth_sound_buf[n + b] = self.tone_burst_hold[b]
+
+
+    # Send tone burst data to YMF825 steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   burst:: [address|header|tone(30byte) * slots|trailer]
+    def send_tone_burst_steps( self, burst ):
+        #Burst write mode
         self.spi_write_byte( 0x08, 0xF6 )
-        self.delay(20)
+        yield 20
         self.spi_write_byte( 0x08, 0x00 )
 
         #Write tone data to YMF825 FIFO.
-#        print("Write timbre tone data to YMF825:", timbre)
-#    print("YMF825 PARAM:", all_sound_param)
-        self.spi_write( 0x07, all_sound_param )
+        self.spi_write( 0x07, burst )
 
 
     # Get Synthesizer data map
@@ -659,6 +1262,22 @@ class ymf825pico_class:
     # Set playing timbre index
     def set_synth_play_timbre( self, timbre ):
         self.synth_play_timbre = timbre
+        self.build_voice_pools()
+
+
+    # Does a timbre use a tone
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    #   databank:: databank (0..DATABANK_MAX-1)
+    #   tone:: Tone index (0..TONES-1)
+    #
+    #   RETURN:: True: a portion of the timbre plays the tone
+    def timbre_uses_tone( self, timbre, databank, tone ):
+        for p in range(self.TIMBRE_PORTIONS):
+            portion = self.synth_timbres[timbre][p]
+            if portion["voice_from"] >= 0 and portion["databank"] == databank and portion["tone"] == tone:
+                return True
+
+        return False
 
 
     # Get timbre voice from
@@ -709,11 +1328,13 @@ class ymf825pico_class:
     # Set databank of the timbre portion tone
     def set_timbre_portion_databank( self, timbre, portion, bank ):
         self.synth_timbres[timbre][portion]["databank"] = bank
+        self.invalidate_timbre_blob( timbre )
 
 
     # Set timbre portion tone
     def set_timbre_portion_tone( self, timbre, portion, tone ):
         self.synth_timbres[timbre][portion]["tone"] = tone
+        self.invalidate_timbre_blob( timbre )
 
 
     # Set timbre portion volume
@@ -729,6 +1350,8 @@ class ymf825pico_class:
     # Set timbre portion midi channel
     def set_timbre_portion_midich( self, timbre, portion, midich ):
         self.synth_timbres[timbre][portion]["midi_ch"] = midich
+        if timbre == self.synth_play_timbre:
+            self.build_midi_routes()
 
 
     # Get timbre portion midi channel
@@ -736,6 +1359,30 @@ class ymf825pico_class:
         return self.synth_timbres[timbre][portion]["midi_ch"]
 
 
+    # Set timbre portion key range (notes out of the range are not played by the portion)
+    #   kfrom:: lowest note number (0..127)
+    #   kto:: highest note number (0..127)
+    def set_timbre_key_range( self, timbre, portion, kfrom, kto ):
+        if kfrom < 0 or kto >= self.NOTES or kfrom > kto:
+            kfrom = 0
+            kto = self.NOTES - 1
+
+        self.synth_timbres[timbre][portion]["key_from"] = kfrom
+        self.synth_timbres[timbre][portion]["key_to"] = kto
+        if timbre == self.synth_play_timbre:
+            self.build_midi_routes()
+
+
+    # Get timbre portion lowest note (timbre data without a key range plays all notes)
+    def get_timbre_key_from( self, timbre, portion ):
+        return self.synth_timbres[timbre][portion].get("key_from", 0)
+
+
+    # Get timbre portion highest note
+    def get_timbre_key_to( self, timbre, portion ):
+        return self.synth_timbres[timbre][portion].get("key_to", self.NOTES - 1)
+
+
     # Get timbre portion volume
     def get_playing_timbre_volume( self, portion ):
         return self.synth_timbres[self.synth_play_timbre][portion]["volume"]
@@ -755,120 +1402,40 @@ class ymf825pico_class:
     #   eql:: Equalizer number (0..2)
     #   ceq#:: ceq-eql-#
     def set_equalizer( self, eql, ceq0 = 1.0, ceq1 = 0.0, ceq2 = 0.0, ceq3 = 0.0, ceq4 = 0.0 ):
+        make_equalizer_frame( self.equalizer_ceq, ceq0, ceq1, ceq2, ceq3, ceq4 )
+        self.set_equalizer_frame( eql, self.equalizer_ceq )
 
-        def dec2bin_frac( dec, sign = False, digits=54 ):
-#            dec=Decimal(str(dec))
-            dec=float(str(dec))
-            mantissa=''
-            nth=0
-            first=0
-            rb=False
-            while dec:
-                if dec  >= 1:
-#                    mantissa += '1'
-                    mantissa += '1' if not sign else '0'
-                    dec = dec -1
-                    if first==0:
-                        first=nth
-                else:
-                    if nth!=0:
-#                        mantissa += '0'
-                        mantissa += '0' if not sign else '1'
-                    else:
-                        mantissa += '0.'
-                dec*=2
-                nth+=1
-                if nth-first==digits:
-                    if dec != 0:
-                        rb=True
-                    break
-
-            carry = False
-            if sign:
-#                print("SIGN BFR:", mantissa)
-                revs = ""
-                lman = len(mantissa)
-                for b in range(1,lman-1):
-                    if mantissa[-b] == "0":
-                        revs = "1" + revs
-                        if b != lman-2:
-                            revs = mantissa[2:lman-b] + revs
-
-                        break
-                    else:
-                        revs = "0" + revs
-                        if b == lman-2:
-                            carry = True
-
-                mantissa = "0." + revs
-#                print("SIGN AFT:", mantissa, carry)
-
-            return mantissa,carry,rb
-
-        # Make CEQ# bytes data
-        def make_ceq_bytes( ceq_num, ceq ):
-            ceq_num = ceq_num * 3 + 1
-
-            if ceq < 0.0:
-                sign = True
-                self.equalizer_ceq[ceq_num] = 0x80
-                ceq = -ceq
-                ceq_int = ( ~int(ceq) ) & 0x07
-                ceq_frc = ceq - int(ceq)
-            else:
-                sign = False
-                self.equalizer_ceq[ceq_num+1] = 0x00
-                ceq_int = int(ceq) & 0x07
-                ceq_frc = ceq - int(ceq)
-
-            if ceq_frc != 0.0:
-                mantissa,carry,rb = dec2bin_frac( ceq_frc, sign, 23 )
-                if carry:
-                    ceq_int += 1
-
-#                print("EQUALIZER BITS and CARRY = INT:", mantissa, carry, "=", ceq_int)
-                self.equalizer_ceq[ceq_num] = self.equalizer_ceq[ceq_num] | ( ceq_int << 4 )
-#                print("FRC:: CEQ INT SHIFT ARRAY FRAC=", ceq, ceq_int, ( ceq_int << 4 ), self.equalizer_ceq[ceq_num], ceq_frc)
-                for b in range(2,len( mantissa )):
-#                    print("BIT:", b, "=", mantissa[b])
-                    if mantissa[b] == "1":
-                        if   b <=  5:       #  2.. 5
-                            self.equalizer_ceq[ceq_num  ] = self.equalizer_ceq[ceq_num  ] | ( 0x01 << ( 5-b) )
-                        elif b <= 13:       #  6..13
-                            self.equalizer_ceq[ceq_num+1] = self.equalizer_ceq[ceq_num+1] | ( 0x01 << (13-b) )
-                        elif b <= 21:       # 14..21
-                            self.equalizer_ceq[ceq_num+2] = self.equalizer_ceq[ceq_num+2] | ( 0x01 << (21-b) )
-
-            else:
-                if sign:
-                    ceq_int += 1
-
-                self.equalizer_ceq[ceq_num] = self.equalizer_ceq[ceq_num] | ( ceq_int << 4 )
-#                print("INT:: CEQ INT SHIFT ARRAY FRAC=", ceq, ceq_int, ( ceq_int << 4 ), self.equalizer_ceq[ceq_num], ceq_frc)
 
-#            print("EQL::", self.equalizer_ceq[ceq_num], self.equalizer_ceq[ceq_num+1], self.equalizer_ceq[ceq_num+2])
+    # Set equalizer by CEQ register data
+    #   eql:: Equalizer number (0..2)
+    #   frame:: CEQ register data (16 bytes) made by make_equalizer_frame()
+    def set_equalizer_frame( self, eql, frame ):
+        self.wait_steps( self.set_equalizer_frame_steps( eql, frame ) )
 
-        # Clear CEQ bytes data
-        for b in range(15):
-            self.equalizer_ceq[b] = 0
 
-        # Make CEQ0 bytes data
-        make_ceq_bytes( 0, ceq0 )
-        make_ceq_bytes( 1, ceq1 )
-        make_ceq_bytes( 2, ceq2 )
-        make_ceq_bytes( 3, ceq3 )
-        make_ceq_bytes( 4, ceq4 )
+    # Set equalizer by CEQ register data steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   eql:: Equalizer number (0..2)
+    #   frame:: CEQ register data (16 bytes) made by make_equalizer_frame()
+    def set_equalizer_frame_steps( self, eql, frame ):
+        # Same parameters are already in YMF825
+        if self.equalizer_shadow_valid[eql] and self.equalizer_shadow[eql] == frame:
+            self.spi_writes_saved += 1
+            return
 
         #Burst write mode and all key notes off
 #    print("EDITOR: YMF825 Burst write mode.")
         self.spi_write_byte( 0x08, 0xF6 )
-        self.delay(20)
+        yield 20
         self.spi_write_byte( 0x08, 0x00 )
 
         #Write tone data to YMF825 FIFO.
 #    print("EDITOR: Write sound data to YMF825.")
 #        print("EQUALIZER", eql, ":", list(self.equalizer_ceq))
-        self.spi_write( 32 + eql, bytearray(list(self.equalizer_ceq)) )
+        self.spi_write( 32 + eql, frame )
+        self.spi_writes += 1
+        self.equalizer_shadow[eql][:] = frame
+        self.equalizer_shadow_valid[eql] = 1
 
 
     # Set timbre voice range.
@@ -884,54 +1451,315 @@ class ymf825pico_class:
         if vfrom <= vto:
             self.synth_timbres[timbre][timbre_portion]["voice_from"] = vfrom
             self.synth_timbres[timbre][timbre_portion]["voice_to"] = vto
+            self.invalidate_timbre_blob( timbre )
+            if timbre == self.synth_play_timbre:
+                self.build_voice_pools()
+
+
+    # Forget all tones in the tone slot cache.
+    # Call this after YMF825 is reset.
+    def reset_tone_cache( self ):
+        for t in range(self.TONE_SLOTS):
+            self.tone_slot_key[t] = -1
+            self.tone_slot_used[t] = 0
+        self.tone_chip_valid = 0
+
+
+    # Forget cached tones changed.
+    #   databank:: databank of the tones (0..DATABANK_MAX-1)
+    #   tone:: tone index (0..TONES-1), -1: all tones in the databank
+    def invalidate_tone_cache( self, databank, tone = -1 ):
+        for t in range(self.TONE_SLOTS):
+            key = self.tone_slot_key[t]
+            if key >= 0 and key // self.TONES == databank and (tone < 0 or key % self.TONES == tone):
+                self.tone_slot_key[t] = -1
+
+        for e in range(self.BANK_TONE_CACHE):
+            key = self.bank_tone_key[e]
+            if key >= 0 and key // self.TONES == databank and (tone < 0 or key % self.TONES == tone):
+                self.bank_tone_key[e] = -1
+
+        for b in range(self.TIMBRE_BLOBS):
+            if self.timbre_blob_timbre[b] >= 0:
+                for key in self.timbre_blob_keys[b]:
+                    if key >= 0 and key // self.TONES == databank and (tone < 0 or key % self.TONES == tone):
+                        self.timbre_blob_timbre[b] = -1
+                        self.timbre_blob[b] = None
+                        break
 
 
-    # Set timbre portion sound (but not send it to YMF825).
+    # Find a tone in the tone slots.
+    #   key:: databank * TONES + tone
+    #
+    #   RETURN:: tone slot, -1 if the tone is not in the slots
+    def find_tone_slot( self, key ):
+        for t in range(self.TONE_SLOTS):
+            if self.tone_slot_key[t] == key:
+                return t
+
+        return -1
+
+
+    # Choose a tone slot to store a new tone, an empty slot or the least recently used slot.
+    #   keep:: bitmask of tone slots not to be replaced
+    #
+    #   RETURN:: tone slot
+    def choose_tone_slot( self, keep ):
+        victim = -1
+        for t in range(self.TONE_SLOTS):
+            if keep & (1 << t):
+                continue
+
+            # Lower empty slot makes the burst write shorter
+            if self.tone_slot_key[t] < 0:
+                return t
+
+            if victim < 0 or self.tone_slot_used[t] < self.tone_slot_used[victim]:
+                victim = t
+
+        return victim
+
+
+    # Forget prebuilt tone burst data.
+    #   timbre:: Timbre index (0..TIMBRES-1), -1: all timbres
+    def invalidate_timbre_blob( self, timbre = -1 ):
+        for b in range(self.TIMBRE_BLOBS):
+            if timbre < 0 or self.timbre_blob_timbre[b] == timbre:
+                self.timbre_blob_timbre[b] = -1
+                self.timbre_blob[b] = None
+
+
+    # Store the tone burst data of the tone slots used by a timbre.
     #   timbre:: Timbre index (0..TIMBRES-1)
-    #   timbre_portion:: timbre index (0..TIMBRE_PORTIONS)
-    def set_timbre_tone( self, timbre, timbre_portion ):
-        def load_tone_in(databank):
-            try:
-                file = open( self.tone_param_file.replace(".txt", str(databank) + ".txt"), encoding = self.file_encode )
-            except OSError as e:
-                print(e)
-            else:
-                tones_parm = json.load( file )
-                file.close()
+    def store_timbre_blob( self, timbre ):
+        slots = 0
+        for p in range(self.TIMBRE_PORTIONS):
+            if self.synth_timbres[timbre][p]["voice_from"] >= 0 and self.portion_tone_slot[p] >= slots:
+                slots = self.portion_tone_slot[p] + 1
 
-            file = None
-            return tones_parm
+        # Replace the blob used least recently
+        victim = 0
+        for b in range(self.TIMBRE_BLOBS):
+            if self.timbre_blob_timbre[b] == timbre or self.timbre_blob_timbre[b] < 0:
+                victim = b
+                break
+
+            if self.timbre_blob_used[b] < self.timbre_blob_used[victim]:
+                victim = b
+
+        n = self.make_tone_burst( slots )
+        self.timbre_blob[victim] = bytearray(self.synth_sound_mv[0:n])
+        self.clear_tone_burst( slots )
+        self.timbre_blob_keys[victim] = array('h', self.tone_slot_key[0:slots])
+        self.timbre_blob_slots[victim] = bytearray(self.portion_tone_slot)
+        self.timbre_blob_timbre[victim] = timbre
+        self.timbre_blob_used[victim] = self.tone_slot_stamp
+
+
+    # Find the prebuilt tone burst data of a timbre.
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    #
+    #   RETURN:: index of the prebuilt data, -1: the timbre has no prebuilt data
+    def find_timbre_blob( self, timbre ):
+        for b in range(self.TIMBRE_BLOBS):
+            if self.timbre_blob_timbre[b] == timbre:
+                return b
+
+        return -1
+
+
+    # Send the prebuilt tone burst data of a timbre steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    #   b:: index of the prebuilt data found by find_timbre_blob()
+    def send_timbre_blob_steps( self, timbre, b ):
+        # The tone slots have the tones in the blob
+        blob = self.timbre_blob[b]
+        self.tone_slot_stamp += 1
+        keys = self.timbre_blob_keys[b]
+        n = 2 + len(keys) * 30
+        self.synth_sound_mv[2:n] = memoryview(blob)[2:n]
+        yield from self.send_sound_to_YMF825_steps( timbre, len(keys) )
+        for t in range(len(keys)):
+            self.tone_slot_key[t] = keys[t]
+            self.tone_slot_used[t] = self.tone_slot_stamp
+
+        for p in range(self.TIMBRE_PORTIONS):
+            self.portion_tone_slot[p] = self.timbre_blob_slots[b][p]
+
+        self.timbre_blob_used[b] = self.tone_slot_stamp
+        self.timbre_blob_hits += 1
+
+
+    # Get tone slot cache statistics
+    #   RETURN:: (hits, misses, timbre changes sent by a prebuilt blob)
+    def get_tone_cache_stats( self ):
+        return (self.tone_cache_hits, self.tone_cache_misses, self.timbre_blob_hits)
+
+
+    # Clear tone slot cache statistics
+    def clear_tone_cache_stats( self ):
+        self.tone_cache_hits = 0
+        self.tone_cache_misses = 0
+        self.timbre_blob_hits = 0
+
+
+    # Set the memory size of the tone cache of the other databanks.
+    # The cached tones are cleared.
+    #   size:: bytes (30 bytes each tone)
+    def set_bank_tone_cache_size( self, size ):
+        self.BANK_TONE_CACHE = max(1, size // 30)             # Tones in the cache
+        self.bank_tone_buf = bytearray(30 * self.BANK_TONE_CACHE)
+        self.bank_tone_mv = memoryview(self.bank_tone_buf)
+        self.bank_tone_key = array('h', [-1] * self.BANK_TONE_CACHE)   # databank * TONES + tone each entry (-1: empty)
+        self.bank_tone_used = array('i', [0] * self.BANK_TONE_CACHE)   # Time stamp of the last use each entry
+        self.bank_tone_stamp = 0
+        self.clear_bank_tone_cache_stats()
+
+
+    # Get a tone in the other databank through the cache.
+    #   databank:: databank of the tone (0..DATABANK_MAX-1)
+    #   tone:: tone index (0..TONES-1)
+    #
+    #   RETURN:: 30 bytes tone parameters (memoryview in the cache), None: no databank
+    def get_bank_tone( self, databank, tone ):
+        key = databank * self.TONES + tone
+        self.bank_tone_stamp += 1
+
+        # Hit
+        lru = 0
+        empty = -1
+        for e in range(self.BANK_TONE_CACHE):
+            k = self.bank_tone_key[e]
+            if k == key:
+                self.bank_tone_hits += 1
+                self.bank_tone_used[e] = self.bank_tone_stamp
+                return self.bank_tone_mv[e * 30:e * 30 + 30]
+
+            if k < 0:
+                if empty < 0:
+                    empty = e
+            elif self.bank_tone_used[e] < self.bank_tone_used[lru]:
+                lru = e
+
+        if empty >= 0:
+            lru = empty
+
+        # Miss: read the tone into an empty or the least recently used entry
+        if not self.open_databank():
+            return None
+
+        self.bank_tone_misses += 1
+        entry = self.bank_tone_mv[lru * 30:lru * 30 + 30]
+        self.databank_archive.read_tone( databank, tone, entry )
+        self.bank_tone_key[lru] = key
+        self.bank_tone_used[lru] = self.bank_tone_stamp
+        return entry
+
+
+    # Get the tone cache statistics of the other databanks
+    #   RETURN:: (hits, misses (tones read from the databank archive))
+    def get_bank_tone_cache_stats( self ):
+        return (self.bank_tone_hits, self.bank_tone_misses)
+
+
+    # Clear the tone cache statistics of the other databanks
+    def clear_bank_tone_cache_stats( self ):
+        self.bank_tone_hits = 0
+        self.bank_tone_misses = 0
 
+
+    # Set timbre portion sound (but not send it to YMF825).
+    # The tone is put in the tone slot cache if it is not in the cache.
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    #   timbre_portion:: timbre index (0..TIMBRE_PORTIONS)
+    #   keep:: bitmask of tone slots not to be replaced
+    #
+    #   RETURN:: tone slot stored the tone newly, -1: the tone is in the cache or the portion has no voice
+    def set_timbre_tone( self, timbre, timbre_portion, keep = 0 ):
         vs = self.synth_timbres[timbre][timbre_portion]["voice_from"];
         vt = self.synth_timbres[timbre][timbre_portion]["voice_to"];
         db = self.synth_timbres[timbre][timbre_portion]["databank"];
-        del_flg = False
+        tone = self.synth_timbres[timbre][timbre_portion]["tone"]
+        if vs < 0 or vs > vt:
+            return -1
+
+        # The tone is in the cache
+        self.tone_slot_stamp += 1
+        key = db * self.TONES + tone
+        slot = self.find_tone_slot( key )
+        if slot >= 0:
+            self.tone_cache_hits += 1
+            self.tone_slot_used[slot] = self.tone_slot_stamp
+            self.portion_tone_slot[timbre_portion] = slot
+            return -1
+
+#        print("SET TIMBER PORTION TONE: T, P, B, T=", timbre, timbre_portion, db, tone, ":", vs, vt )
+        self.tone_cache_misses += 1
+        slot = self.choose_tone_slot( keep )
+        sound = self.synth_sounds[slot]
+
+        # A tone in the other databank is read through the tone cache of the other databanks
         if db != self.DATABANK:
-#            print("LOAD TONES in db, DATABANK=", db, self.DATABANK)
-            tones_parm = load_tone_in(db)
-            del_flg = True
+#            print("LOAD TONE in db, DATABANK=", db, self.DATABANK)
+            parm = self.get_bank_tone( db, tone )
+            if parm is None:
+                return -1
+            sound[0:30] = parm
         else:
-            tones_parm = self.synth_tones
+            parm = self.synth_tones[tone]
+            for b in range(30):
+                sound[b] = parm[2 + b]
 
-        if vs >=0 and vs <= vt:
-#            print("SET TIMBER PORTION TONE", timbre, timbre_portion, self.synth_timbres[self.synth_play_timbre][timbre_portion]["tone"], ":", vs, vt )
-#            print("SET TIMBER PORTION TONE: T, P, B, T=", timbre, timbre_portion, db, self.synth_timbres[timbre][timbre_portion]["tone"], ":", vs, vt )
-            for v in range(vs,vt+1):
-                self.synth_sounds[v] = tones_parm[self.synth_timbres[timbre][timbre_portion]["tone"]].copy()
-
-        if del_flg:
-            del tones_parm
+        self.tone_slot_key[slot] = key
+        self.tone_slot_used[slot] = self.tone_slot_stamp
+        self.portion_tone_slot[timbre_portion] = slot
+        return slot
 
 
     # Set timber sound and send it to YMF825.
+    # Only the tone slots up to the last tone not in the cache are sent.
     #   timbre:: Timbre index (0..TIMBRES-1)
     def set_timbre_tones( self, timbre ):
+        self.wait_steps( self.set_timbre_tones_steps( timbre ) )
+
+
+    # Set timber sound and send it to YMF825 steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    def set_timbre_tones_steps( self, timbre ):
+        # Tone slots used by the timbre must not be replaced each other
+        keep = 0
+        missing = False
         for p in range(self.TIMBRE_PORTIONS):
-            self.set_timbre_tone( timbre, p )
+            vs = self.synth_timbres[timbre][p]["voice_from"]
+            if vs >= 0:
+                slot = self.find_tone_slot( self.synth_timbres[timbre][p]["databank"] * self.TONES + self.synth_timbres[timbre][p]["tone"] )
+                if slot >= 0:
+                    keep |= 1 << slot
+                else:
+                    missing = True
+
+        # Send the prebuilt burst data instead of loading the tones
+        if missing:
+            b = self.find_timbre_blob( timbre )
+            if b >= 0:
+                yield from self.send_timbre_blob_steps( timbre, b )
+                return
+
+        slots = 0
+        for p in range(self.TIMBRE_PORTIONS):
+            slot = self.set_timbre_tone( timbre, p, keep )
+            if slot >= 0:
+                keep |= 1 << slot
+                if slot >= slots:
+                    slots = slot + 1
 #        print("TIMBRE TONE:", "tmbtone_T" + str(p))
 #        gui_timbre_pane["tmbtone_T" + str(p)]["object"].set( synth_tone_names[synth_timbres[synth_play_timbre][p]["tone"]] )
 
-        self.send_sound_to_YMF825( timbre )
+        if slots > 0:
+            yield from self.send_sound_to_YMF825_steps( timbre, slots )
+            self.store_timbre_blob( timbre )
 
 
     # Rename tone name
@@ -953,6 +1781,7 @@ class ymf825pico_class:
     
         elif self.synth_tone_names.count( name ) == 0:
             self.synth_tone_names[tone] = name
+            self.set_name_index( self.DATABANK, NAME_TONE, tone, name )
 #        set_playing_timbre( synth_play_timbre )
             return ( "INFO", "TONE", "Tone name was renamed." )
 
@@ -961,6 +1790,7 @@ class ymf825pico_class:
 
         else:
             self.synth_tone_names[tone] = name
+            self.set_name_index( self.DATABANK, NAME_TONE, tone, name )
 
         return ("","TONE","")
 
@@ -983,6 +1813,7 @@ class ymf825pico_class:
 
         elif self.synth_timbre_names.count( name ) == 0:
             self.synth_timbre_names[timbre] = name
+            self.set_name_index( self.DATABANK, NAME_TIMBRE, timbre, name )
             return ( "INFO", "TIMBER", "Timbre name was renamed." )
 
         elif self.synth_timbre_names.index( name ) != timbre:
@@ -1005,6 +1836,7 @@ class ymf825pico_class:
 
         elif self.synth_equalizer_names.count( name ) == 0:
             self.synth_equalizer_names[eql] = name
+            self.set_name_index( self.DATABANK, NAME_EQUALIZER, eql, name )
             return ( "INFO", "EQUALIZER", "Equalizer name was renamed." )
 
         elif eql >= 2 and self.synth_equalizer_names.index( name ) != eql:
@@ -1064,19 +1896,36 @@ class ymf825pico_class:
     # This function is for sound editor.
     #   paramHash:: Tone parameter to edit as a hash
     def set_editing_tone( self, paramHash ):
+        self.wait_steps( self.set_editing_tone_steps( paramHash ) )
+
+
+    # Set the editing tone to YMF825 steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   paramHash:: tone parameters to edit
+    def set_editing_tone_steps( self, paramHash ):
         # Make the sound parameter bytearray (sound_param)
         self.make_sound_param(paramHash)
 
+        for b in range(len(self.spi_tone_buf)):
+            self.spi_tone_buf[b] = self.sound_param[b]
+        self.tone_slot_key[0] = -1                   # Tone slot 0 has the editing tone
+        sound = memoryview(self.spi_tone_buf)[2:32]
+        if self.is_tone_slot_in_chip( 0, sound ):
+            self.tone_uploads_skipped += 1
+            return
+
         #Burst write mode and all key notes off
 #    print("EDITOR: YMF825 Burst write mode.")
         self.spi_write_byte( 0x08, 0xF6 )
-        self.delay(20)
+        yield 20
         self.spi_write_byte( 0x08, 0x00 )
 
         #Write tone data to YMF825 FIFO.
 #    print("EDITOR: Write sound data to YMF825.")
 #    print("Set end:", sound_param)
-        self.spi_write( 0x07, bytearray(self.sound_param) )
+        self.spi_write( 0x07, self.spi_tone_buf )
+        self.tone_uploads += 1
+        self.set_tone_slot_in_chip( 0, sound )
 #    print("Write end:", sound_param)
 
 
@@ -1084,14 +1933,15 @@ class ymf825pico_class:
     # The sound parameters in self.sound_param is set by self.set_editing_tone()
     #   tone: Tone index.
     def save_edited_data_to_tone( self, tone ):
-        self.synth_tones[tone] = self.sound_param.copy()
+        self.synth_tones[tone] = bytearray(self.sound_param)
+        self.invalidate_tone_cache( self.DATABANK, tone )
     #    print("Save:", sound_param)
 
 
     # Copy a tone to the sound parameters to edit
     #   tone: Tone index.
     def copy_tone_data_for_edit( self, tone ):
-        self.sound_param = self.synth_tones[tone].copy()
+        self.sound_param = bytearray(self.synth_tones[tone])
     #    print("Edit:", sound_param)
         return self.get_editing_tone( self.sound_param )
 
@@ -1099,10 +1949,18 @@ class ymf825pico_class:
     # Set equalizer
     #   eql:: Equalizer setting number (0..EQUALIZERS-1)
     def set_synth_equalizer( self, eql ):
+        self.wait_steps( self.set_synth_equalizer_steps( eql ) )
+
+
+    # Set equalizer steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    #   eql:: Equalizer setting number (0..EQUALIZERS-1)
+    def set_synth_equalizer_steps( self, eql ):
         if eql >= 0 and eql < self.EQUALIZERS:
             self.synth_selected_equalizer = eql
             for e in range(3):
-                self.set_equalizer( e, self.synth_equalizer_settings[eql][e]["ceq0"], self.synth_equalizer_settings[eql][e]["ceq1"], self.synth_equalizer_settings[eql][e]["ceq2"], self.synth_equalizer_settings[eql][e]["ceq3"], self.synth_equalizer_settings[eql][e]["ceq4"] )
+                f = eql * self.EQ_FRAMES_BYTES + e * 16
+                yield from self.set_equalizer_frame_steps( e, self.synth_equalizer_frames_mv[f:f + 16] )
 
 
     # Save edited equalizer parameters to an equalizer
@@ -1119,6 +1977,17 @@ class ymf825pico_class:
             for c in range(5):
                 self.synth_equalizer_settings[eql][2]["ceq"+str(c)] = eq2["ceq"+str(c)]
 
+            self.make_equalizer_frames( eql )
+
+
+    # Make CEQ register data of an equalizer setting
+    #   eql:: Equalizer setting number (0..EQUALIZERS-1)
+    def make_equalizer_frames( self, eql ):
+        for e in range(3):
+            f = eql * self.EQ_FRAMES_BYTES + e * 16
+            ceq = self.synth_equalizer_settings[eql][e]
+            make_equalizer_frame( self.synth_equalizer_frames_mv[f:f + 16], ceq["ceq0"], ceq["ceq1"], ceq["ceq2"], ceq["ceq3"], ceq["ceq4"] )
+
 
     # Get equalizer parameters
     #   eql:: Equalizer setting number (0..EQUALIZERS-1)
@@ -1141,170 +2010,351 @@ class ymf825pico_class:
             self.DATABANK = databank
 
 
-    # Load tone data.
-    def load_tone_data( self ):
+    # Open the databank archive.
+    # The archive is made from the JSON text files of the previous versions if it does not exist.
+    #   RETURN:: True: opened / False: no databank
+    def open_databank( self ):
+        if self.databank_archive.open():
+            return True
+
+        print("Make databank archive:", self.databank_archive.file)
         try:
-            file = open( self.tone_name_file.replace(".txt", str(self.DATABANK) + ".txt"), encoding = self.file_encode )
+            json_to_archive( self.databank_archive, "", self.file_encode, (self.tone_name_file, self.tone_param_file, self.timbre_name_file, self.timbre_param_file, self.equalizer_name_file, self.equalizer_param_file) )
         except OSError as e:
             print(e)
-        else:
-            self.synth_tone_names = json.load( file )
-            file.close()
+            return False
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            # Broken JSON text file, the archive made partly is removed
+            print("Broken databank JSON text file:", e)
+            self.databank_archive.remove()
+            return False
 
-        file = None
+        gc.collect()
+        return self.databank_archive.open()
 
-        try:
-            file = open( self.tone_param_file.replace(".txt", str(self.DATABANK) + ".txt"), encoding = self.file_encode )
-        except OSError as e:
-            print(e)
-        else:
-            self.synth_tones = json.load( file )
-            file.close()
 
-        file = None
+    # Load tone data.
+    def load_tone_data( self ):
+        if not self.open_databank():
+            return
+
+        archive = self.databank_archive
+        self.synth_tone_names = self.get_databank_names( self.DATABANK, NAME_TONE )
+        for t in range(self.TONES):
+            parm = bytearray(36)
+            parm[1] = 0x80 + self.VOICES
+            archive.read_tone( self.DATABANK, t, memoryview(parm)[2:32] )
+            parm[32:36] = self.TONE_BURST_TRAILER
+            self.synth_tones[t] = parm
+
+        self.invalidate_tone_cache( self.DATABANK )
 
 
     # Load timbre data.
     def load_timbre_data( self ):
-        try:
-            file = open( self.timbre_name_file.replace(".txt", str(self.DATABANK) + ".txt"), encoding = self.file_encode )
-        except OSError as e:
-            print(e)
-        else:
-            self.synth_timbre_names = json.load( file )
-            file.close()
+        if not self.open_databank():
+            return
 
-        file = None
+        archive = self.databank_archive
+        self.synth_timbre_names = self.get_databank_names( self.DATABANK, NAME_TIMBRE )
+        for t in range(self.TIMBRES):
+            self.synth_timbres[t] = archive.read_timbre( self.DATABANK, t )
 
-        try:
-            file = open( self.timbre_param_file.replace(".txt", str(self.DATABANK) + ".txt"), encoding = self.file_encode )
-        except OSError as e:
-            print(e)
-        else:
-            self.synth_timbres = json.load( file )
-            file.close()
+        self.invalidate_timbre_blob()
 
-        file = None
+        # Voice pools and MIDI routes of the playing timbre loaded
+        self.build_voice_pools()
 
 
     # Load equalizer data.
     def load_equalizer_data( self ):
-        try:
-            file = open( self.equalizer_name_file.replace(".txt", str(self.DATABANK) + ".txt"), encoding = self.file_encode )
-        except OSError as e:
-            print(e)
-        else:
-            self.synth_equalizer_names = json.load( file )
-            file.close()
+        if not self.open_databank():
+            return
 
-        file = None
+        archive = self.databank_archive
+        self.synth_equalizer_names = self.get_databank_names( self.DATABANK, NAME_EQUALIZER )
+        for e in range(self.EQUALIZERS):
+            f = e * self.EQ_FRAMES_BYTES
+            self.synth_equalizer_settings[e] = archive.read_equalizer( self.DATABANK, e, self.synth_equalizer_frames_mv[f:f + self.EQ_FRAMES_BYTES] )
 
+
+    # Save tone data (only the records changed are written).
+    def save_tone_data( self ):
+        if not self.open_databank():
+            return
+
+        self.databank_archive.begin()
         try:
-            file = open( self.equalizer_param_file.replace(".txt", str(self.DATABANK) + ".txt") , encoding = self.file_encode )
-        except OSError as e:
-            print(e)
-        else:
-            self.synth_equalizer_settings = json.load( file )
-            file.close()
+            self.save_names( NAME_TONE, self.synth_tone_names )
+            for t in range(self.TONES):
+                self.write_tone_record( t )
+
+            self.databank_archive.commit()
+        except:
+            self.databank_archive.abort()
+            raise
 
-        file = None
 
+    # Save timbre data (only the records changed are written).
+    def save_timbre_data( self ):
+        if not self.open_databank():
+            return
 
-    # Save tone data.
-    def save_tone_data( self, name_file = "YMF825ToneName.txt", tone_file = "YMF825ToneParm.txt", encode = "utf-8" ):
+        self.databank_archive.begin()
         try:
-            file = open( name_file.replace(".txt", str(self.DATABANK) + ".txt"), "w", encoding = encode )
-        except OSError as e:
-            print(e)
-        else:
-            json.dump( self.synth_tone_names, file )
-            file.close()
+            self.save_names( NAME_TIMBRE, self.synth_timbre_names )
+            for t in range(self.TIMBRES):
+                self.databank_archive.write_timbre( self.DATABANK, t, self.synth_timbres[t] )
 
-        file = None
+            self.databank_archive.commit()
+        except:
+            self.databank_archive.abort()
+            raise
 
+
+    # Save equalizer data (only the records changed are written).
+    def save_equalizer_data( self ):
+        if not self.open_databank():
+            return
+
+        self.databank_archive.begin()
         try:
-            file = open( tone_file.replace(".txt", str(self.DATABANK) + ".txt"), "w", encoding = encode )
-        except OSError as e:
-            print(e)
-        else:
-            json.dump( self.synth_tones, file )
-            file.close()
+            self.save_names( NAME_EQUALIZER, self.synth_equalizer_names )
+            for e in range(self.EQUALIZERS):
+                self.write_equalizer_record( e )
 
-        file = None
+            self.databank_archive.commit()
+        except:
+            self.databank_archive.abort()
+            raise
 
 
-    # Save timbre data.
-    def save_timbre_data( self, name_file = "YMF825TimbreName.txt", timbre_file = "YMF825TimbreParm.txt", encode = "utf-8" ):
+    # Write a tone of the current databank to the databank archive
+    #   tone:: Tone index (0..TONES-1)
+    def write_tone_record( self, tone ):
+        self.databank_archive.write_tone( self.DATABANK, tone, memoryview(self.synth_tones[tone])[2:32] )
+
+
+    # Write an equalizer of the current databank to the databank archive
+    #   eql:: Equalizer setting number (0..EQUALIZERS-1)
+    def write_equalizer_record( self, eql ):
+        f = eql * self.EQ_FRAMES_BYTES
+        self.databank_archive.write_equalizer( self.DATABANK, eql, self.synth_equalizer_settings[eql], self.synth_equalizer_frames_mv[f:f + self.EQ_FRAMES_BYTES] )
+
+
+    # Save a tone of the current databank.
+    #   tone:: Tone index (0..TONES-1)
+    def save_tone( self, tone ):
+        for wait in self.save_tone_steps( tone ):
+            pass
+
+
+    # Save a tone of the current databank in steps (journal append, then the commit steps).
+    #   tone:: Tone index (0..TONES-1)
+    #
+    #   Generator yields 0 (no time to wait) after each step.
+    def save_tone_steps( self, tone ):
+        if not self.open_databank():
+            return
+
+        self.databank_archive.begin()
         try:
-            file = open( name_file.replace(".txt", str(self.DATABANK) + ".txt"), "w", encoding = encode )
-        except OSError as e:
-            print(e)
-        else:
-            json.dump( self.synth_timbre_names, file )
-            file.close()
+            self.write_tone_record( tone )
+            yield 0
+            yield from self.databank_archive.commit_steps()
+        except:
+            self.databank_archive.abort()
+            raise
 
-        file = None
 
+    # Save a timbre of the current databank.
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    def save_timbre( self, timbre ):
+        for wait in self.save_timbre_steps( timbre ):
+            pass
+
+
+    # Save a timbre of the current databank in steps (journal append, then the commit steps).
+    #   timbre:: Timbre index (0..TIMBRES-1)
+    #
+    #   Generator yields 0 (no time to wait) after each step.
+    def save_timbre_steps( self, timbre ):
+        if not self.open_databank():
+            return
+
+        self.databank_archive.begin()
         try:
-            file = open( timbre_file.replace(".txt", str(self.DATABANK) + ".txt"), "w", encoding = encode )
-        except OSError as e:
-            print(e)
-        else:
-            json.dump( self.synth_timbres, file )
-            file.close()
+            self.databank_archive.write_timbre( self.DATABANK, timbre, self.synth_timbres[timbre] )
+            yield 0
+            yield from self.databank_archive.commit_steps()
+        except:
+            self.databank_archive.abort()
+            raise
 
-        file = None
 
+    # Save an equalizer of the current databank.
+    #   eql:: Equalizer setting number (0..EQUALIZERS-1)
+    def save_equalizer( self, eql ):
+        for wait in self.save_equalizer_steps( eql ):
+            pass
 
-    # Save equalizer data.
-    def save_equalizer_data( self, name_file = "YMF825EQName.txt", equalizer_file = "YMF825EQParm.txt", encode = "utf-8" ):
+
+    # Save an equalizer of the current databank in steps (journal append, then the commit steps).
+    #   eql:: Equalizer setting number (0..EQUALIZERS-1)
+    #
+    #   Generator yields 0 (no time to wait) after each step.
+    def save_equalizer_steps( self, eql ):
+        if not self.open_databank():
+            return
+
+        self.databank_archive.begin()
         try:
-            file = open( name_file.replace(".txt", str(self.DATABANK) + ".txt"), "w", encoding = encode )
-        except OSError as e:
-            print(e)
-        else:
-            json.dump( self.synth_equalizer_names, file )
-            file.close()
+            self.write_equalizer_record( eql )
+            yield 0
+            yield from self.databank_archive.commit_steps()
+        except:
+            self.databank_archive.abort()
+            raise
+
+
+    # Save a name of the current databank.
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #   n:: tone, timbre or equalizer index
+    def save_name( self, kind, n ):
+        for wait in self.save_name_steps( kind, n ):
+            pass
 
-        file = None
 
+    # Save a name of the current databank in steps (journal append, then the commit steps).
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #   n:: tone, timbre or equalizer index
+    #
+    #   Generator yields 0 (no time to wait) after each step.
+    def save_name_steps( self, kind, n ):
+        if not self.open_databank():
+            return
+
+        name = (self.synth_tone_names, self.synth_timbre_names, self.synth_equalizer_names)[kind][n]
+        self.databank_archive.begin()
         try:
-            file = open( equalizer_file.replace(".txt", str(self.DATABANK) + ".txt"), "w", encoding = encode )
-        except OSError as e:
-            print(e)
-        else:
-            json.dump( self.synth_equalizer_settings, file )
-            file.close()
+            self.databank_archive.write_name( self.DATABANK, kind, n, name )
+            yield 0
+            yield from self.databank_archive.commit_steps()
+        except:
+            self.databank_archive.abort()
+            raise
+        self.set_name_index( self.DATABANK, kind, n, name )
+
+
+    # Get names in a databank from the name index
+    #   databank:: databank (0..DATABANK_MAX-1)
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #
+    #   RETURN:: list of the names, [] : no databank
+    def get_databank_names( self, databank, kind ):
+        archive = self.databank_archive
+        section = databank * self.NAME_SECTION_BYTES
+        if self.name_index_loaded & (1 << databank) == 0:
+            if not self.open_databank():
+                return []
+
+            archive.read_name_section( databank, self.name_index_mv[section:section + self.NAME_SECTION_BYTES] )
+            self.name_index_loaded |= 1 << databank
+
+        names = []
+        for n in range(archive.NAMES[kind]):
+            r = section + (archive.NAME_START[kind] + n) * self.NAME_BYTES
+            names.append( decode_name( self.name_index_mv[r:r + self.NAME_BYTES] ) )
 
-        file = None
+        return names
+
+
+    # Get tone names in a databank
+    # The databank not in the name index is read from the archive, call it in the engine.
+    #   databank:: databank (0..DATABANK_MAX-1)
+    #
+    #   RETURN:: list of the tone names, [] : no databank
+    def get_databank_tone_names( self, databank ):
+        return self.get_databank_names( databank, NAME_TONE )
+
+
+    # Set a name in the name index (the databank not in the index yet is read later)
+    #   databank:: databank (0..DATABANK_MAX-1)
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #   n:: tone, timbre or equalizer index
+    #   name:: name
+    def set_name_index( self, databank, kind, n, name ):
+        if self.name_index_loaded & (1 << databank):
+            r = databank * self.NAME_SECTION_BYTES + (self.databank_archive.NAME_START[kind] + n) * self.NAME_BYTES
+            encode_name( self.name_index_mv[r:r + self.NAME_BYTES], name )
+
+
+    # Save names of the current databank to the databank archive and the name index
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #   names:: list of the names
+    def save_names( self, kind, names ):
+        self.databank_archive.write_names( self.DATABANK, kind, names )
+        for n in range(len(names)):
+            self.set_name_index( self.DATABANK, kind, n, names[n] )
+
+
+    # Save a tone to a databank
+    #   databank:: databank (0..DATABANK_MAX-1)
+    #   tone:: Tone index (0..TONES-1)
+    #   parm:: tone parameters [address, header, 30 bytes, trailer] made by make_sound_param()
+    def save_tone_to_databank( self, databank, tone, parm ):
+        if not self.open_databank():
+            return
+
+        for b in range(30):
+            self.databank_tone[b] = parm[2 + b]
+
+        self.databank_archive.begin()
+        try:
+            self.databank_archive.write_tone( databank, tone, self.databank_tone )
+            self.databank_archive.commit()
+        except:
+            self.databank_archive.abort()
+            raise
+        self.invalidate_tone_cache( databank, tone )
+        if databank == self.DATABANK:
+            self.synth_tones[tone] = bytearray(parm)
 
 
     # Reset and Initialize YMF825.
     def init_YMF825( self ):
+        self.wait_steps( self.init_YMF825_steps() )
+
+
+    # Reset and Initialize YMF825 steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    def init_YMF825_steps( self ):
         self.YMF825_reset.high()
 #        print("RESET HIGH")
-        self.delay(1000)
+        yield 1000
         self.YMF825_reset.low()
 #        print("RESET LOW")
-        self.delay(1000)
+        yield 1000
         self.YMF825_reset.high()
-        self.delay(1000)
+        yield 1000
 #        print("Reset YMF825.")
+        self.reset_register_shadow()
+        self.reset_tone_cache()
       
         self.spi_write_byte( 0x1D, 0x00 )
         self.spi_write_byte( 0x02, 0x0E )
-        self.delay(20)
+        yield 20
       
         self.spi_write_byte( 0x00, 0x01 )
         self.spi_write_byte( 0x01, 0x00 )
         self.spi_write_byte( 0x1A, 0xA3 )
-        self.delay(20)
+        yield 20
       
         self.spi_write_byte( 0x1A, 0x00 )
-        self.delay( 40 )
+        yield 40
       
         self.spi_write_byte( 0x02, 0x04 )
-        self.delay( 20 )
+        yield 20
     
         self.spi_write_byte( 0x02, 0x00 )
     
@@ -1315,7 +2365,7 @@ class ymf825pico_class:
         self.spi_write_byte( 0x03, 0x01 )
     
         self.spi_write_byte( 0x08, 0xF6 )
-        self.delay( 40 )
+        yield 40
         self.spi_write_byte( 0x08, 0x00 )
         self.spi_write_byte( 0x09, 0xF8 )
         self.spi_write_byte( 0x0A, 0x00 )
@@ -1337,6 +2387,15 @@ class ymf825pico_class:
         self.init_YMF825()
 
 
+    # Set up hardware steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    def setup_hardware_steps( self ):
+        self.led_turn( True )
+        self.chip_select( False )
+        print("Set up YMF825")
+        yield from self.init_YMF825_steps()
+
+
     # Set up software
     def setup_synth( self ):
         # Clear tone data
@@ -1405,3 +2464,9 @@ class ymf825pico_class:
     def turn_on_synthesizer( self ):
 #        self.init()
         self.setup_hardware()
+
+
+    # Turn the Synthsize on steps.
+    # Generator yields the time (msec) to wait after each step, the caller waits for it.
+    def turn_on_synthesizer_steps( self ):
+        yield from self.setup_hardware_steps()
@@ -0,0 +1,768 @@
+# -*- coding: utf-8 -*-
+##################################################################################
+# Databank archive for YMF825 synthesizer with Raspberry Pi PICO.
+#
+#   All databanks are in one binary file of fixed size records,
+#   a tone, a timbre, an equalizer or a name is read and written by seek + readinto/write.
+#
+#   HEADER (16 bytes):
+#     "Y825", version, banks, tones, timbres, equalizers, portions, name bytes, 0 * 5
+#   INDEX (banks * 4 * 4 bytes, little endian):
+#     Offsets of the tone, timbre, equalizer and name sections each databank
+#   TONE SECTION (tones * 30 bytes):
+#     YMF825 tone parameters (without the header 0, 0x80+voices and the trailer 0x80, 0x03, 0x81, 0x80)
+#   TIMBRE SECTION (timbres * portions * 8 bytes):
+#     midi_ch, voice_from, voice_to (signed), tone, volume, databank, key_from, key_to
+#   EQUALIZER SECTION (equalizers * 108 bytes):
+#     ceq0..ceq4 * 3 equalizers (float32), and CEQ register data * 3 equalizers (16 bytes each)
+#   NAME SECTION ((tones + timbres + equalizers) * name bytes):
+#     Tone names, timbre names and equalizer names (utf-8, padded by 0)
+#
+#   JOURNAL (archive file name + ".jnl"):
+#     Records written in a transaction (begin() .. commit()) are appended to the journal,
+#     only the records changed are written.  commit() appends a commit mark, then patches
+#     the records in the archive in place.  The journal is removed when it grows (compaction).
+#     When the archive is opened, the committed transactions in the journal are patched again
+#     and the transaction not committed is dropped, so power loss while saving does not break a databank.
+#       ENTRY: offset in the archive (uint32), length (uint16), sum of the bytes (uint16), record data
+#       COMMIT MARK: 0xFFFFFFFF, number of the entries, sum of the entry sums
+#
+#   The converter makes the archive from the JSON text files of the previous versions, and back.
+#     python ymf825pico_databank.py tobin|tojson [folder]
+#
+# Copyright (c) by Shunsuke Ohira
+#   01.000 2026/10/16: Indexed binary databank archive and JSON converter
+#   01.001 2026/10/16: Name section read at once for the name index
+#   01.002 2026/10/16: Record level saves through an append only journal
+#   01.003 2026/10/16: JSON text file names can be given to the converter
+#   01.004 2026/10/16: A record written again in a transaction is always journaled
+#   01.005 2026/10/16: A transaction left open is dropped by begin()
+#   01.006 2026/10/16: Commit in steps (commit mark, patches, sync) for the engine to run between
+#   01.007 2026/10/16: begin() never drops a transaction of another caller (open or being committed)
+#   01.008 2026/10/16: remove() to remove an archive made from broken JSON text files
+##################################################################################
+
+import struct
+import json
+import os
+from array import array
+
+# Sections in a databank
+SECTION_TONE = 0
+SECTION_TIMBRE = 1
+SECTION_EQUALIZER = 2
+SECTION_NAME = 3
+
+# Name kinds
+NAME_TONE = 0
+NAME_TIMBRE = 1
+NAME_EQUALIZER = 2
+
+# JSON text files of the previous versions (the databank number is put before ".txt")
+#   (tone names, tone parameters, timbre names, timbre parameters, equalizer names, equalizer parameters)
+JSON_FILES = ("YMF825ToneName.txt", "YMF825ToneParm.txt", "YMF825TimbreName.txt", "YMF825TimbreParm.txt", "YMF825EQName.txt", "YMF825EQParm.txt")
+
+
+# Decode a name record
+#   buf:: name record (padded by 0)
+#
+#   RETURN:: name string
+def decode_name( buf ):
+    length = len(buf)
+    while length > 0 and buf[length - 1] == 0:
+        length -= 1
+
+    return str(bytes(buf[0:length]), "utf-8")
+
+
+# Encode a name record
+#   buf:: name record to encode in (the bytes over the record size are cut, the rest is padded by 0)
+#   name:: name string
+def encode_name( buf, name ):
+    data = name.encode("utf-8")
+    for b in range(len(buf)):
+        buf[b] = data[b] if b < len(data) else 0
+
+
+# Make CEQ register data of an equalizer
+#   frame:: bytearray(16) to make the data in
+#   ceq#:: ceq-eql-#
+def make_equalizer_frame( frame, ceq0 = 1.0, ceq1 = 0.0, ceq2 = 0.0, ceq3 = 0.0, ceq4 = 0.0 ):
+
+    def dec2bin_frac( dec, sign = False, digits=54 ):
+#            dec=Decimal(str(dec))
+        dec=float(str(dec))
+        mantissa=''
+        nth=0
+        first=0
+        rb=False
+        while dec:
+            if dec  >= 1:
+#                    mantissa += '1'
+                mantissa += '1' if not sign else '0'
+                dec = dec -1
+                if first==0:
+                    first=nth
+            else:
+                if nth!=0:
+#                        mantissa += '0'
+                    mantissa += '0' if not sign else '1'
+                else:
+                    mantissa += '0.'
+            dec*=2
+            nth+=1
+            if nth-first==digits:
+                if dec != 0:
+                    rb=True
+                break
+
+        carry = False
+        if sign:
+#                print("SIGN BFR:", mantissa)
+            revs = ""
+            lman = len(mantissa)
+            for b in range(1,lman-1):
+                if mantissa[-b] == "0":
+                    revs = "1" + revs
+                    if b != lman-2:
+                        revs = mantissa[2:lman-b] + revs
+
+                    break
+                else:
+                    revs = "0" + revs
+                    if b == lman-2:
+                        carry = True
+
+            mantissa = "0." + revs
+#                print("SIGN AFT:", mantissa, carry)
+
+        return mantissa,carry,rb
+
+    # Make CEQ# bytes data
+    def make_ceq_bytes( ceq_num, ceq ):
+        ceq_num = ceq_num * 3 + 1
+
+        if ceq < 0.0:
+            sign = True
+            frame[ceq_num] = 0x80
+            ceq = -ceq
+            ceq_int = ( ~int(ceq) ) & 0x07
+            ceq_frc = ceq - int(ceq)
+        else:
+            sign = False
+            frame[ceq_num+1] = 0x00
+            ceq_int = int(ceq) & 0x07
+            ceq_frc = ceq - int(ceq)
+
+        if ceq_frc != 0.0:
+            mantissa,carry,rb = dec2bin_frac( ceq_frc, sign, 23 )
+            if carry:
+                ceq_int += 1
+
+#                print("EQUALIZER BITS and CARRY = INT:", mantissa, carry, "=", ceq_int)
+            frame[ceq_num] = frame[ceq_num] | ( ceq_int << 4 )
+#                print("FRC:: CEQ INT SHIFT ARRAY FRAC=", ceq, ceq_int, ( ceq_int << 4 ), frame[ceq_num], ceq_frc)
+            for b in range(2,len( mantissa )):
+#                    print("BIT:", b, "=", mantissa[b])
+                if mantissa[b] == "1":
+                    if   b <=  5:       #  2.. 5
+                        frame[ceq_num  ] = frame[ceq_num  ] | ( 0x01 << ( 5-b) )
+                    elif b <= 13:       #  6..13
+                        frame[ceq_num+1] = frame[ceq_num+1] | ( 0x01 << (13-b) )
+                    elif b <= 21:       # 14..21
+                        frame[ceq_num+2] = frame[ceq_num+2] | ( 0x01 << (21-b) )
+
+        else:
+            if sign:
+                ceq_int += 1
+
+            frame[ceq_num] = frame[ceq_num] | ( ceq_int << 4 )
+#                print("INT:: CEQ INT SHIFT ARRAY FRAC=", ceq, ceq_int, ( ceq_int << 4 ), frame[ceq_num], ceq_frc)
+
+#            print("EQL::", frame[ceq_num], frame[ceq_num+1], frame[ceq_num+2])
+
+    # Clear CEQ bytes data
+    for b in range(len(frame)):
+        frame[b] = 0
+
+    # Make CEQ0 bytes data
+    make_ceq_bytes( 0, ceq0 )
+    make_ceq_bytes( 1, ceq1 )
+    make_ceq_bytes( 2, ceq2 )
+    make_ceq_bytes( 3, ceq3 )
+    make_ceq_bytes( 4, ceq4 )
+
+class databank_archive_class:
+
+    # Constructor
+    #   file:: archive file name
+    def __init__( self, file = "YMF825Bank.bin", banks = 10, tones = 20, timbres = 20, equalizers = 10, portions = 4 ):
+        self.file = file
+        self.VERSION = 1
+        self.BANKS = banks
+        self.TONES = tones
+        self.TIMBRES = timbres
+        self.EQUALIZERS = equalizers
+        self.PORTIONS = portions
+
+        # Record sizes
+        self.HEADER_BYTES = 16
+        self.INDEX_BYTES = banks * 4 * 4
+        self.TONE_BYTES = 30
+        self.PORTION_BYTES = 8
+        self.TIMBRE_BYTES = portions * self.PORTION_BYTES
+        self.EQ_STAGES = 3
+        self.EQ_FRAME_BYTES = 16
+        self.EQ_BYTES = self.EQ_STAGES * 5 * 4 + self.EQ_STAGES * self.EQ_FRAME_BYTES
+        self.NAME_BYTES = 16
+        self.NAMES = [tones, timbres, equalizers]
+        self.NAME_START = [0, tones, tones + timbres]       # Index of the first name each kind in the name section
+        self.NAME_SECTION_BYTES = (tones + timbres + equalizers) * self.NAME_BYTES
+        self.BANK_BYTES = tones * self.TONE_BYTES + timbres * self.TIMBRE_BYTES + equalizers * self.EQ_BYTES + (tones + timbres + equalizers) * self.NAME_BYTES
+
+        self.index = array('I', [0] * (banks * 4))           # Offset of each section each databank
+        self.record = bytearray(max(self.TIMBRE_BYTES, self.EQ_BYTES, self.NAME_BYTES))
+        self.record_mv = memoryview(self.record)
+        self.fp = None
+
+        # Journal
+        self.journal_file = file + ".jnl"
+        self.JOURNAL_ENTRY = "<IHH"                         # offset, length, sum
+        self.JOURNAL_ENTRY_BYTES = 8
+        self.JOURNAL_COMMIT = 0xFFFFFFFF                    # offset of the commit mark
+        self.JOURNAL_COMPACT_BYTES = 4096                   # The journal is removed when it grows over this size
+        self.journal_entry = bytearray(self.JOURNAL_ENTRY_BYTES)
+        self.current = bytearray(len(self.record))          # Record in the archive to compare with a record written
+        self.current_mv = memoryview(self.current)
+        self.journal_fp = None                              # Journal opened in a transaction
+        self.journal_size = 0
+        self.journal_offsets = []                           # Records written in the transaction: (offset in the archive, offset in the journal, length)
+        self.journal_sum = 0
+
+
+    # Open the archive.
+    #   RETURN:: True: opened / False: no archive or not an archive
+    def open( self ):
+        if self.fp is not None:
+            return True
+
+        try:
+            fp = open( self.file, "r+b" )
+        except OSError:
+            return False
+
+        header = fp.read( self.HEADER_BYTES )
+        if len(header) != self.HEADER_BYTES or header[0:4] != b"Y825" or header[4] != self.VERSION or tuple(header[5:11]) != (self.BANKS, self.TONES, self.TIMBRES, self.EQUALIZERS, self.PORTIONS, self.NAME_BYTES):
+            fp.close()
+            return False
+
+        fp.readinto( self.index )
+        self.fp = fp
+        self.recover()
+        return True
+
+
+    # Close the archive.
+    def close( self ):
+        self.abort()
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+
+    # Remove the archive (and its journal).
+    def remove( self ):
+        self.close()
+        self.remove_journal()
+        try:
+            os.remove( self.file )
+        except OSError:
+            pass
+
+
+    # Make an empty archive (all records are 0).
+    def create( self ):
+        self.close()
+        self.remove_journal()
+        with open( self.file, "wb" ) as fp:
+            fp.write( b"Y825" + bytes([self.VERSION, self.BANKS, self.TONES, self.TIMBRES, self.EQUALIZERS, self.PORTIONS, self.NAME_BYTES]) + bytes(5) )
+            offset = self.HEADER_BYTES + self.INDEX_BYTES
+            for bank in range(self.BANKS):
+                i = bank * 4
+                self.index[i + SECTION_TONE] = offset
+                self.index[i + SECTION_TIMBRE] = self.index[i + SECTION_TONE] + self.TONES * self.TONE_BYTES
+                self.index[i + SECTION_EQUALIZER] = self.index[i + SECTION_TIMBRE] + self.TIMBRES * self.TIMBRE_BYTES
+                self.index[i + SECTION_NAME] = self.index[i + SECTION_EQUALIZER] + self.EQUALIZERS * self.EQ_BYTES
+                offset += self.BANK_BYTES
+
+            fp.write( self.index )
+            zero = bytes(self.BANK_BYTES)
+            for bank in range(self.BANKS):
+                fp.write( zero )
+
+        return self.open()
+
+
+    # Read a record.
+    #   bank:: databank
+    #   section:: SECTION_*
+    #   n:: record number in the section
+    #   buf:: buffer to read into (the size is the record size)
+    def read_record( self, bank, section, n, buf ):
+        self.fp.seek( self.index[bank * 4 + section] + n * len(buf) )
+        self.fp.readinto( buf )
+
+
+    # Write a record.
+    # In a transaction, the record is appended to the journal only when it is changed
+    # (or written in the transaction already, the last one is patched),
+    # and the record read before commit() is the record in the archive.
+    #   bank:: databank
+    #   section:: SECTION_*
+    #   n:: record number in the section
+    #   buf:: record data (the size is the record size)
+    def write_record( self, bank, section, n, buf ):
+        offset = self.index[bank * 4 + section] + n * len(buf)
+        if self.journal_fp is None:
+            self.fp.seek( offset )
+            self.fp.write( buf )
+            return
+
+        # Not changed (the archive is compared only when the record is not in the journal)
+        length = len(buf)
+        journaled = False
+        for entry in self.journal_offsets:
+            if entry[0] == offset:
+                journaled = True
+                break
+
+        if not journaled:
+            current = self.current_mv[0:length]
+            self.fp.seek( offset )
+            self.fp.readinto( current )
+            b = 0
+            while b < length and current[b] == buf[b]:
+                b += 1
+            if b == length:
+                return
+
+        rsum = sum(buf) & 0xffff
+        struct.pack_into( self.JOURNAL_ENTRY, self.journal_entry, 0, offset, length, rsum )
+        self.journal_fp.write( self.journal_entry )
+        self.journal_fp.write( buf )
+        self.journal_offsets.append( (offset, self.journal_size + self.JOURNAL_ENTRY_BYTES, length) )
+        self.journal_size += self.JOURNAL_ENTRY_BYTES + length
+        self.journal_sum = (self.journal_sum + rsum) & 0xffff
+
+
+    # Write the records written into the file.
+    def flush( self ):
+        if self.fp is not None:
+            self.fp.flush()
+
+
+    # Size of the journal
+    #   RETURN:: bytes (0: no journal)
+    def get_journal_size( self ):
+        try:
+            return os.stat( self.journal_file )[6]
+        except OSError:
+            return 0
+
+
+    # Remove the journal.
+    def remove_journal( self ):
+        try:
+            os.remove( self.journal_file )
+        except OSError:
+            pass
+
+
+    # Begin a transaction, the records written are saved by commit().
+    # A transaction open or being committed (commit_steps() not completed) belongs to another caller,
+    # it is never dropped here, OSError is raised instead.
+    def begin( self ):
+        if self.journal_fp is not None or len(self.journal_offsets) > 0:
+            raise OSError("Databank transaction in progress.")
+
+        self.journal_size = self.get_journal_size()
+        self.journal_fp = open( self.journal_file, "ab" )
+        self.journal_offsets = []
+        self.journal_sum = 0
+
+
+    # Commit the transaction: append the commit mark to the journal, and patch the records in the archive.
+    #   RETURN:: number of the records saved
+    def commit( self ):
+        entries = len(self.journal_offsets) if self.journal_fp is not None else 0
+        for wait in self.commit_steps():
+            pass
+
+        return entries
+
+
+    # Commit the transaction in steps, the caller can do other work between the steps.
+    # Steps: the commit mark (journal sync), a record patch each, the archive sync, the compaction.
+    # The transaction committed is recovered from the journal if the patches are not completed.
+    #   Generator yields 0 (no time to wait) after each step.
+    def commit_steps( self ):
+        if self.journal_fp is None:
+            return
+
+        entries = len(self.journal_offsets)
+        if entries == 0:
+            self.abort()
+            return
+
+        struct.pack_into( self.JOURNAL_ENTRY, self.journal_entry, 0, self.JOURNAL_COMMIT, entries, self.journal_sum )
+        self.journal_fp.write( self.journal_entry )
+        self.journal_fp.close()
+        self.journal_fp = None
+        self.journal_size += self.JOURNAL_ENTRY_BYTES
+        yield 0
+
+        # Patch the archive by the records in the journal
+        with open( self.journal_file, "rb" ) as jfp:
+            for (offset, joffset, length) in self.journal_offsets:
+                buf = self.record_mv[0:length]
+                jfp.seek( joffset )
+                jfp.readinto( buf )
+                self.fp.seek( offset )
+                self.fp.write( buf )
+                yield 0
+
+        self.fp.flush()
+        self.journal_offsets = []
+
+        # Compaction (all the transactions in the journal are in the archive)
+        if self.journal_size > self.JOURNAL_COMPACT_BYTES:
+            yield 0
+            self.remove_journal()
+
+
+    # Drop the transaction.
+    # The journal having the records dropped is removed, the transactions committed before are in the archive already.
+    # A transaction committed but not patched completely is patched from the journal.
+    def abort( self ):
+        if self.journal_fp is None:
+            if len(self.journal_offsets) > 0:
+                self.journal_offsets = []
+                self.recover()
+            return
+
+        fp = self.journal_fp
+        self.journal_fp = None
+        entries = len(self.journal_offsets)
+        self.journal_offsets = []
+        try:
+            fp.close()
+        except OSError:
+            pass
+
+        if entries > 0:
+            self.remove_journal()
+
+
+    # Patch the archive by the transactions committed in the journal, and remove the journal.
+    # The entries after the last commit mark or broken are dropped.
+    #   RETURN:: number of the records patched
+    def recover( self ):
+        try:
+            jfp = open( self.journal_file, "rb" )
+        except OSError:
+            return 0
+
+        patched = 0
+        with jfp:
+            start = 0                                       # Journal offset of the transaction
+            while True:
+                # Check a transaction
+                entries = 0
+                tsum = 0
+                pos = start
+                committed = False
+                while True:
+                    jfp.seek( pos )
+                    if jfp.readinto( self.journal_entry ) != self.JOURNAL_ENTRY_BYTES:
+                        break
+
+                    (offset, length, rsum) = struct.unpack_from( self.JOURNAL_ENTRY, self.journal_entry, 0 )
+                    if offset == self.JOURNAL_COMMIT:
+                        committed = length == entries and rsum == tsum
+                        break
+
+                    buf = self.record_mv[0:length] if length <= len(self.record) else None
+                    if buf is None or jfp.readinto( buf ) != length or sum(buf) & 0xffff != rsum:
+                        break
+
+                    entries += 1
+                    tsum = (tsum + rsum) & 0xffff
+                    pos += self.JOURNAL_ENTRY_BYTES + length
+
+                if not committed or entries == 0:
+                    break
+
+                # Patch the records of the transaction
+                pos = start
+                for e in range(entries):
+                    jfp.seek( pos )
+                    jfp.readinto( self.journal_entry )
+                    (offset, length, rsum) = struct.unpack_from( self.JOURNAL_ENTRY, self.journal_entry, 0 )
+                    buf = self.record_mv[0:length]
+                    jfp.readinto( buf )
+                    self.fp.seek( offset )
+                    self.fp.write( buf )
+                    pos += self.JOURNAL_ENTRY_BYTES + length
+
+                patched += entries
+                start = pos + self.JOURNAL_ENTRY_BYTES
+
+        self.fp.flush()
+        self.remove_journal()
+        return patched
+
+
+    # Read a tone.
+    #   bank:: databank
+    #   tone:: tone number
+    #   buf:: 30 bytes buffer (bytearray or memoryview) to read the YMF825 tone parameters into
+    def read_tone( self, bank, tone, buf ):
+        self.read_record( bank, SECTION_TONE, tone, buf )
+
+
+    # Write a tone.
+    #   bank:: databank
+    #   tone:: tone number
+    #   buf:: 30 bytes YMF825 tone parameters
+    def write_tone( self, bank, tone, buf ):
+        self.write_record( bank, SECTION_TONE, tone, buf )
+
+
+    # Read a timbre.
+    #   bank:: databank
+    #   timbre:: timbre number
+    #
+    #   RETURN:: [{"midi_ch", "voice_from", "voice_to", "tone", "volume", "databank", "key_from", "key_to"} * portions]
+    def read_timbre( self, bank, timbre ):
+        buf = self.record_mv[0:self.TIMBRE_BYTES]
+        self.read_record( bank, SECTION_TIMBRE, timbre, buf )
+        portions = []
+        for p in range(self.PORTIONS):
+            (midi_ch, vfrom, vto, tone, volume, db, kfrom, kto) = struct.unpack_from( "<BbbBBBBB", buf, p * self.PORTION_BYTES )
+            portions.append({"midi_ch": midi_ch, "voice_from": vfrom, "voice_to": vto, "tone": tone, "volume": volume, "databank": db, "key_from": kfrom, "key_to": kto})
+
+        return portions
+
+
+    # Write a timbre.
+    #   bank:: databank
+    #   timbre:: timbre number
+    #   portions:: [{"midi_ch", "voice_from", "voice_to", "tone", "volume", "databank", "key_from", "key_to"} * portions]
+    def write_timbre( self, bank, timbre, portions ):
+        buf = self.record_mv[0:self.TIMBRE_BYTES]
+        for p in range(self.PORTIONS):
+            prt = portions[p]
+            struct.pack_into( "<BbbBBBBB", buf, p * self.PORTION_BYTES, prt.get("midi_ch", p + 1), prt.get("voice_from", -1), prt.get("voice_to", -1), prt.get("tone", 0), prt.get("volume", 0), prt.get("databank", bank), prt.get("key_from", 0), prt.get("key_to", 127) )
+
+        self.write_record( bank, SECTION_TIMBRE, timbre, buf )
+
+
+    # Read an equalizer.
+    #   bank:: databank
+    #   eql:: equalizer number
+    #   frames:: 48 bytes buffer to read the CEQ register data of the 3 equalizers into (None: not read)
+    #
+    #   RETURN:: [{"ceq0".."ceq4"} * 3]
+    def read_equalizer( self, bank, eql, frames = None ):
+        buf = self.record_mv[0:self.EQ_BYTES]
+        self.read_record( bank, SECTION_EQUALIZER, eql, buf )
+        settings = []
+        for e in range(self.EQ_STAGES):
+            ceq = struct.unpack_from( "<5f", buf, e * 20 )
+            settings.append({"ceq0": ceq[0], "ceq1": ceq[1], "ceq2": ceq[2], "ceq3": ceq[3], "ceq4": ceq[4]})
+
+        if frames is not None:
+            frames[0:self.EQ_STAGES * self.EQ_FRAME_BYTES] = buf[self.EQ_STAGES * 20:]
+
+        return settings
+
+
+    # Write an equalizer.
+    #   bank:: databank
+    #   eql:: equalizer number
+    #   settings:: [{"ceq0".."ceq4"} * 3]
+    #   frames:: 48 bytes CEQ register data of the 3 equalizers
+    def write_equalizer( self, bank, eql, settings, frames ):
+        buf = self.record_mv[0:self.EQ_BYTES]
+        for e in range(self.EQ_STAGES):
+            s = settings[e]
+            struct.pack_into( "<5f", buf, e * 20, s["ceq0"], s["ceq1"], s["ceq2"], s["ceq3"], s["ceq4"] )
+
+        buf[self.EQ_STAGES * 20:] = frames[0:self.EQ_STAGES * self.EQ_FRAME_BYTES]
+        self.write_record( bank, SECTION_EQUALIZER, eql, buf )
+
+
+    # Read names.
+    #   bank:: databank
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #
+    #   RETURN:: list of the names
+    def read_names( self, bank, kind ):
+        buf = self.record_mv[0:self.NAME_BYTES]
+        names = []
+        for n in range(self.NAMES[kind]):
+            self.read_record( bank, SECTION_NAME, self.NAME_START[kind] + n, buf )
+            names.append( decode_name( buf ) )
+
+        return names
+
+
+    # Read all names in a databank at once.
+    #   bank:: databank
+    #   buf:: buffer (NAME_SECTION_BYTES) to read the name section into
+    def read_name_section( self, bank, buf ):
+        self.read_record( bank, SECTION_NAME, 0, buf )
+
+
+    # Write a name.
+    #   bank:: databank
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #   n:: tone, timbre or equalizer number
+    #   name:: name (the bytes over the name size are cut)
+    def write_name( self, bank, kind, n, name ):
+        buf = self.record_mv[0:self.NAME_BYTES]
+        encode_name( buf, name )
+        self.write_record( bank, SECTION_NAME, self.NAME_START[kind] + n, buf )
+
+
+    # Write names.
+    #   bank:: databank
+    #   kind:: NAME_TONE, NAME_TIMBRE or NAME_EQUALIZER
+    #   names:: list of the names
+    def write_names( self, bank, kind, names ):
+        for n in range(min(len(names), self.NAMES[kind])):
+            self.write_name( bank, kind, n, names[n] )
+
+
+# JSON text file name of a databank
+#   folder:: folder of the JSON files ("": current folder)
+#   file_name:: file name in JSON_FILES
+#   bank:: databank
+#
+#   RETURN:: file name with the databank number
+def json_file( folder, file_name, bank ):
+    return folder + file_name.replace(".txt", str(bank) + ".txt")
+
+
+# Load a JSON file
+#   RETURN:: data in the file, None: no file
+def load_json( file_name, encode = "utf-8" ):
+    try:
+        with open( file_name, encoding = encode ) as file:
+            return json.load( file )
+    except OSError:
+        return None
+
+
+# Make the archive from the JSON text files.
+#   archive:: databank_archive_class
+#   folder:: folder of the JSON files ("": current folder)
+#   files:: JSON text file names (same order as JSON_FILES)
+def json_to_archive( archive, folder = "", encode = "utf-8", files = JSON_FILES ):
+    archive.create()
+    tone = bytearray(archive.TONE_BYTES)
+    frames = bytearray(archive.EQ_STAGES * archive.EQ_FRAME_BYTES)
+    frames_mv = memoryview(frames)
+    for bank in range(archive.BANKS):
+        # Tones
+        tones = load_json( json_file( folder, files[1], bank ), encode )
+        if tones is not None:
+            for t in range(min(len(tones), archive.TONES)):
+                for b in range(archive.TONE_BYTES):
+                    tone[b] = tones[t][2 + b]
+                archive.write_tone( bank, t, tone )
+        tones = None
+
+        # Timbres
+        timbres = load_json( json_file( folder, files[3], bank ), encode )
+        if timbres is not None:
+            for t in range(min(len(timbres), archive.TIMBRES)):
+                archive.write_timbre( bank, t, timbres[t] )
+        timbres = None
+
+        # Equalizers
+        equalizers = load_json( json_file( folder, files[5], bank ), encode )
+        if equalizers is not None:
+            for e in range(min(len(equalizers), archive.EQUALIZERS)):
+                for s in range(archive.EQ_STAGES):
+                    ceq = equalizers[e][s]
+                    make_equalizer_frame( frames_mv[s * archive.EQ_FRAME_BYTES:(s + 1) * archive.EQ_FRAME_BYTES], ceq["ceq0"], ceq["ceq1"], ceq["ceq2"], ceq["ceq3"], ceq["ceq4"] )
+                archive.write_equalizer( bank, e, equalizers[e], frames )
+        equalizers = None
+
+        # Names
+        for (kind, name_file) in ((NAME_TONE, files[0]), (NAME_TIMBRE, files[2]), (NAME_EQUALIZER, files[4])):
+            names = load_json( json_file( folder, name_file, bank ), encode )
+            if names is not None:
+                archive.write_names( bank, kind, names )
+
+    archive.flush()
+
+
+# Make the JSON text files from the archive.
+#   archive:: databank_archive_class (opened)
+#   folder:: folder of the JSON files ("": current folder)
+#   files:: JSON text file names (same order as JSON_FILES)
+def archive_to_json( archive, folder = "", encode = "utf-8", files = JSON_FILES ):
+    tone = bytearray(archive.TONE_BYTES)
+    for bank in range(archive.BANKS):
+        tones = []
+        for t in range(archive.TONES):
+            archive.read_tone( bank, t, tone )
+            tones.append( [0, 0x80 + 16] + list(tone) + [0x80, 0x03, 0x81, 0x80] )
+
+        timbres = []
+        for t in range(archive.TIMBRES):
+            portions = archive.read_timbre( bank, t )
+            for prt in portions:
+                if prt["key_from"] == 0 and prt["key_to"] == 127:
+                    del prt["key_from"]
+                    del prt["key_to"]
+            timbres.append( portions )
+
+        equalizers = []
+        for e in range(archive.EQUALIZERS):
+            settings = archive.read_equalizer( bank, e )
+            for s in settings:
+                for c in s:
+                    s[c] = float("%.7g" % s[c])
+            equalizers.append( settings )
+
+        for (data, data_file) in ((tones, files[1]), (timbres, files[3]), (equalizers, files[5]), (archive.read_names( bank, NAME_TONE ), files[0]), (archive.read_names( bank, NAME_TIMBRE ), files[2]), (archive.read_names( bank, NAME_EQUALIZER ), files[4])):
+            with open( json_file( folder, data_file, bank ), "w", encoding = encode ) as file:
+                json.dump( data, file )
+
+
+# Converter
+#   python ymf825pico_databank.py tobin|tojson [folder]
+if __name__ == "__main__":
+    import sys
+
+    folder = sys.argv[2] if len(sys.argv) > 2 else ""
+    if folder != "" and folder[-1] != "/":
+        folder += "/"
+
+    archive = databank_archive_class( folder + "YMF825Bank.bin" )
+    if len(sys.argv) > 1 and sys.argv[1] == "tobin":
+        json_to_archive( archive, folder )
+        archive.close()
+
+    elif len(sys.argv) > 1 and sys.argv[1] == "tojson":
+        if archive.open():
+            archive_to_json( archive, folder )
+            archive.close()
+        else:
+            print("No databank archive:", archive.file)
+
+    else:
+        print("python ymf825pico_databank.py tobin|tojson [folder]")
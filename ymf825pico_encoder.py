@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+##################################################################################
+# Rotary encoders for YMF825 synthesizer with Raspberry Pi PICO.
+#
+#   Quadrature decoder driven by Pin IRQ on both edges of A and B pins.
+#   A transition of (A, B) is decoded by a state transition table,
+#   and a step is counted when the encoder comes back to the rest position (A=1, B=1).
+#   The main loop reads the steps accumulated since the last read,
+#   so the steps in a UI frame are handled as one change.
+#   Steps turned fast are multiplied (acceleration) on the encoders accelerated.
+#
+#     Clockwise:        11 -> 01 -> 00 -> 10 -> 11  (+1)
+#     Counterclockwise: 11 -> 10 -> 00 -> 01 -> 11  (-1)
+#
+# Copyright (c) by Shunsuke Ohira
+#   01.000 2026/10/16: Pin IRQ quadrature decoder
+#   01.001 2026/10/16: Acceleration by the interval of steps
+##################################################################################
+
+from machine import Pin, disable_irq, enable_irq
+from array import array
+import time
+
+class rotary_encoder_class:
+
+    # Constructor
+    #   pins:: [(A pin GPIO, B pin GPIO), ...] each encoder
+    #   accel:: [True: accelerated, False: not, ...] each encoder, None: no encoder is accelerated
+    def __init__( self, pins, accel = None ):
+        self.ENCODERS = len(pins)
+
+        # Acceleration: a step is multiplied when the interval from the previous step is short
+        self.ACCEL_FAST_MS = 25                             # Interval (ms) of fast turn
+        self.ACCEL_FAST_STEPS = 4                           # Steps of a fast turn step
+        self.ACCEL_MID_MS = 60                              # Interval (ms) of middle speed turn
+        self.ACCEL_MID_STEPS = 2                            # Steps of a middle speed turn step
+        self.accel = bytearray(self.ENCODERS)
+        if accel is not None:
+            for n in range(self.ENCODERS):
+                self.accel[n] = 1 if accel[n] else 0
+        self.step_ms = array('i', [0] * self.ENCODERS)      # Time (ticks_ms) of the last step each encoder
+
+        # Quarter step each transition [previous AB << 2 | current AB]
+        #   Both pins changed at once or no change is 0 (bounce or missed edge)
+        self.TRANSITION = array('b', [
+             0, -1, +1,  0,         # 00 -> 00, 01, 10, 11
+            +1,  0,  0, -1,         # 01 -> 00, 01, 10, 11
+            -1,  0,  0, +1,         # 10 -> 00, 01, 10, 11
+             0, +1, -1,  0          # 11 -> 00, 01, 10, 11
+        ])
+
+        self.pin_a = []
+        self.pin_b = []
+        self.state = bytearray([0b11] * self.ENCODERS)     # Previous AB each encoder
+        self.quarters = array('b', [0] * self.ENCODERS)     # Quarter steps since the rest position each encoder
+        self.steps = array('i', [0] * self.ENCODERS)        # Steps not read yet each encoder
+        self.handlers = []
+        for n in range(self.ENCODERS):
+            a = Pin(pins[n][0], Pin.IN, Pin.PULL_UP)
+            b = Pin(pins[n][1], Pin.IN, Pin.PULL_UP)
+            self.pin_a.append(a)
+            self.pin_b.append(b)
+            self.state[n] = (a.value() << 1) | b.value()
+
+            # Handler knowing the encoder number
+            handler = self.make_handler(n)
+            self.handlers.append(handler)
+            a.irq(handler = handler, trigger = Pin.IRQ_RISING | Pin.IRQ_FALLING)
+            b.irq(handler = handler, trigger = Pin.IRQ_RISING | Pin.IRQ_FALLING)
+
+
+    # Make a Pin IRQ handler of an encoder.
+    #   n:: encoder number
+    def make_handler( self, n ):
+        def handler( pin ):
+            self.on_change( n )
+        return handler
+
+
+    # Decode a transition of an encoder (Pin IRQ).
+    #   n:: encoder number
+    def on_change( self, n ):
+        ab = (self.pin_a[n].value() << 1) | self.pin_b[n].value()
+        prev = self.state[n]
+        if ab == prev:
+            return
+
+        self.state[n] = ab
+        q = self.quarters[n] + self.TRANSITION[(prev << 2) | ab]
+
+        # A step at the rest position
+        if ab == 0b11:
+            step = 1 if q >= 2 else (-1 if q <= -2 else 0)
+            if step != 0 and self.accel[n]:
+                now = time.ticks_ms()
+                interval = time.ticks_diff(now, self.step_ms[n])
+                self.step_ms[n] = now
+                if interval < self.ACCEL_FAST_MS:
+                    step *= self.ACCEL_FAST_STEPS
+                elif interval < self.ACCEL_MID_MS:
+                    step *= self.ACCEL_MID_STEPS
+
+            self.steps[n] += step
+            q = 0
+
+        elif q > 4 or q < -4:
+            q = 0
+
+        self.quarters[n] = q
+
+
+    # Get steps since the last call.
+    #   n:: encoder number
+    #
+    #   RETURN:: steps (plus: clockwise, minus: counterclockwise)
+    def get_steps( self, n ):
+        irq = disable_irq()
+        steps = self.steps[n]
+        self.steps[n] = 0
+        enable_irq(irq)
+        return steps
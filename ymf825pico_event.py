@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+##################################################################################
+# Timestamped event queue for YMF825 synthesizer with Raspberry Pi PICO.
+#
+#   Events of 3 bytes (status, data1, data2) with the time (ticks_us) to dispatch,
+#   kept in a binary heap on preallocated arrays (no allocation to post and dispatch).
+#   Events at the same time are dispatched in the posted order.
+#   The engine posts live MIDI and score events into the queue,
+#   and dispatches the events due in its loop.
+#   Lateness (dispatched time - due time) is recorded to see the event jitter
+#   (an exponential moving average, never grows to a long integer).
+#
+# Copyright (c) by Shunsuke Ohira
+#   01.000 2026/10/16: Event queue on a binary heap with lateness statistics
+#   01.001 2026/10/16: Average lateness is an exponential moving average
+##################################################################################
+
+from array import array
+import time
+
+class event_queue_class:
+
+    # Constructor
+    #   capacity:: maximum events in the queue
+    def __init__( self, capacity = 64 ):
+        self.CAPACITY = capacity
+        self.SERIAL_MASK = 0x3fffffff
+        self.SERIAL_HALF = 0x20000000
+        self.due = array('i', [0] * capacity)               # Time (ticks_us) to dispatch each event
+        self.event = array('i', [0] * capacity)             # status << 16 | data1 << 8 | data2
+        self.serial = array('i', [0] * capacity)            # Posted order (for events at the same time)
+        self.count = 0                                      # Events in the queue
+        self.next_serial = 0
+        self.LATE_AVG_SHIFT = 4                             # Lateness average weight of an event (1/16)
+        self.clear_stats()
+
+
+    # Is an event dispatched before another event
+    #   i, j:: indexes of the heap
+    #
+    #   RETURN:: True: i is before j
+    def before( self, i, j ):
+        d = time.ticks_diff(self.due[i], self.due[j])
+        if d != 0:
+            return d < 0
+
+        return ((self.serial[i] - self.serial[j]) & self.SERIAL_MASK) >= self.SERIAL_HALF
+
+
+    # Swap events in the heap
+    #   i, j:: indexes of the heap
+    def swap( self, i, j ):
+        self.due[i], self.due[j] = self.due[j], self.due[i]
+        self.event[i], self.event[j] = self.event[j], self.event[i]
+        self.serial[i], self.serial[j] = self.serial[j], self.serial[i]
+
+
+    # Post an event.
+    #   due:: time (ticks_us) to dispatch
+    #   status, data1, data2:: event bytes
+    #
+    #   RETURN:: True: posted / False: dropped (the queue is full)
+    def post( self, due, status, data1, data2 ):
+        n = self.count
+        if n == self.CAPACITY:
+            self.dropped += 1
+            return False
+
+        self.due[n] = due
+        self.event[n] = (status << 16) | (data1 << 8) | data2
+        self.serial[n] = self.next_serial
+        self.next_serial = (self.next_serial + 1) & self.SERIAL_MASK
+        self.count = n + 1
+
+        # Sift up
+        while n > 0:
+            p = (n - 1) >> 1
+            if not self.before(n, p):
+                break
+            self.swap(n, p)
+            n = p
+
+        return True
+
+
+    # Remove the first event.
+    def remove_first( self ):
+        self.count -= 1
+        last = self.count
+        if last == 0:
+            return
+
+        self.due[0] = self.due[last]
+        self.event[0] = self.event[last]
+        self.serial[0] = self.serial[last]
+
+        # Sift down
+        n = 0
+        while True:
+            c = n * 2 + 1
+            if c >= last:
+                break
+            if c + 1 < last and self.before(c + 1, c):
+                c += 1
+            if not self.before(c, n):
+                break
+            self.swap(n, c)
+            n = c
+
+
+    # Time to the first event.
+    #   RETURN:: microseconds to the first event (0: due) / -1: no event
+    def wait_us( self ):
+        if self.count == 0:
+            return -1
+
+        d = time.ticks_diff(self.due[0], time.ticks_us())
+        return d if d > 0 else 0
+
+
+    # Dispatch the events due.
+    #   handler:: function(status, data1, data2) called each event
+    #
+    #   RETURN:: number of events dispatched
+    def dispatch( self, handler ):
+        dispatched = 0
+        while self.count > 0:
+            late = time.ticks_diff(time.ticks_us(), self.due[0])
+            if late < 0:
+                break
+
+            ev = self.event[0]
+            self.remove_first()
+
+            # Lateness statistics
+            self.dispatched += 1
+            self.late_avg += (late - self.late_avg) >> self.LATE_AVG_SHIFT
+            if late > self.late_max:
+                self.late_max = late
+
+            handler(ev >> 16, (ev >> 8) & 0xff, ev & 0xff)
+            dispatched += 1
+
+        return dispatched
+
+
+    # Remove all events.
+    def clear( self ):
+        self.count = 0
+
+
+    # Get dispatch statistics
+    #   RETURN:: (events dispatched, average lateness (us, moving average), maximum lateness (us), events dropped)
+    def get_stats( self ):
+        return (self.dispatched, self.late_avg, self.late_max, self.dropped)
+
+
+    # Clear dispatch statistics
+    def clear_stats( self ):
+        self.dispatched = 0
+        self.late_avg = 0
+        self.late_max = 0
+        self.dropped = 0
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+##################################################################################
+# MIDI byte stream parser for YMF825 synthesizer with Raspberry Pi PICO.
+#
+#   Parse MIDI bytes read from UART in bulk, and make channel messages as
+#   events of 3 bytes (status, data1, data2) in a preallocated bytearray.
+#
+#   - Running status is supported.
+#   - Messages having one data byte (0xCn, 0xDn) are 3 bytes events with data2 = 0.
+#   - Real time messages (0xF8..0xFF) are handled even in a message, and do not make events.
+#     Timing Clock (0xF8) counts the clock pulses (24 per quarter note) and estimates the tempo,
+#     Start (0xFA), Continue (0xFB) and Stop (0xFC) change the clock running state.
+#     The others (Active Sensing, ...) are dropped.
+#   - System exclusive (0xF0..0xF7) and system common messages are dropped.
+#   - A message can be split between parse() calls.
+#
+#   MIDI bytes are received into a ring buffer by UART RX interrupt
+#   (or by a timer where UART.irq is not available), and read by readinto().
+#
+#   MIDI bytes to send (THRU and merged messages) are put into a ring buffer,
+#   and written to UART TX no faster than the baud rate allows.
+#
+# Copyright (c) by Shunsuke Ohira
+#   01.000 2026/10/16: MIDI parser with running status and SysEx skipping
+#   01.001 2026/10/16: UART RX ring buffer filled by interrupt
+#   01.002 2026/10/16: MIDI clock pulse counter and tempo estimate
+#   01.003 2026/10/16: MIDI THRU/merge output ring buffer written to UART TX by the baud rate
+##################################################################################
+
+from machine import UART, Timer
+import time
+
+class midi_parser_class:
+
+    # Constructor
+    #   events:: maximum events made by a parse() call
+    def __init__( self, events = 64 ):
+        self.EVENTS = events
+        self.events = bytearray(events * 3)                 # [status, data1, data2] * event_count
+        self.event_count = 0
+
+        # Number of data bytes each status (index: status >> 4 - 8)
+        self.DATA_BYTES = bytes([2, 2, 2, 2, 1, 1, 2, 0])   # 0x8n, 0x9n, 0xAn, 0xBn, 0xCn, 0xDn, 0xEn, 0xFn
+
+        # MIDI clock
+        self.CLOCK_PPQN = 24                                # Clock pulses per quarter note
+        self.CLOCK_TIMEOUT_US = 250000                      # Longer interval is not a tempo (clock stopped)
+        self.clock_pulses = 0                               # Clock pulses since Start
+        self.clock_starts = 0                               # Number of Start received
+        self.clock_running = False                          # Between Start/Continue and Stop
+        self.clock_us = 0                                   # Time (ticks_us) of the last clock pulse
+        self.clock_interval_us = 0                          # Smoothed clock pulse interval (0: unknown)
+
+        self.reset()
+
+
+    # Reset parser state.
+    def reset( self ):
+        self.running_status = 0                             # Status of the channel message receiving (0: none)
+        self.data_needed = 0                                # Data bytes of the running status message
+        self.data_count = 0                                 # Data bytes received in the current message
+        self.data1 = 0                                      # The first data byte of the current message
+        self.skip_bytes = 0                                 # Data bytes of system common message to drop
+        self.in_sysex = False                               # Receiving system exclusive message
+
+
+    # Parse MIDI bytes.
+    # Events are made in self.events from index 0.
+    # Parsing stops when the events buffer is full, call it again from the returned index.
+    #   buf:: MIDI bytes (bytes, bytearray or memoryview)
+    #   start:: index of buf to start parsing
+    #   end:: index of buf to stop parsing
+    #
+    #   RETURN:: index of buf parsed next
+    def parse( self, buf, start, end ):
+        events = self.events
+        count = 0
+        status = self.running_status
+        needed = self.data_needed
+        received = self.data_count
+        data1 = self.data1
+        pos = start
+        while pos < end:
+            b = buf[pos]
+            pos += 1
+
+            # Real time messages (Timing Clock, Active Sensing, ...)
+            if b >= 0xF8:
+                # Timing Clock: the interval is smoothed by 1/8 of the difference
+                if b == 0xF8:
+                    now = time.ticks_us()
+                    d = time.ticks_diff(now, self.clock_us)
+                    self.clock_us = now
+                    self.clock_pulses += 1
+                    if d < self.CLOCK_TIMEOUT_US:
+                        if self.clock_interval_us == 0:
+                            self.clock_interval_us = d
+                        else:
+                            self.clock_interval_us += (d - self.clock_interval_us) >> 3
+
+                # Start
+                elif b == 0xFA:
+                    self.clock_pulses = 0
+                    self.clock_starts += 1
+                    self.clock_running = True
+
+                # Continue
+                elif b == 0xFB:
+                    self.clock_running = True
+
+                # Stop
+                elif b == 0xFC:
+                    self.clock_running = False
+
+                continue
+
+            # Status byte
+            if b & 0x80:
+                received = 0
+                if b < 0xF0:
+                    # Channel message
+                    status = b
+                    needed = self.DATA_BYTES[(b >> 4) - 8]
+                    self.in_sysex = False
+                    self.skip_bytes = 0
+                else:
+                    # System exclusive and system common cancel the running status
+                    status = 0
+                    self.in_sysex = b == 0xF0
+                    self.skip_bytes = 2 if b == 0xF2 else (1 if b == 0xF1 or b == 0xF3 else 0)
+                continue
+
+            # Data byte
+            if self.in_sysex:
+                continue
+
+            if self.skip_bytes > 0:
+                self.skip_bytes -= 1
+                continue
+
+            if status == 0:
+                continue
+
+            if received == 0 and needed == 2:
+                data1 = b
+                received = 1
+                continue
+
+            # A message completed
+            i = count * 3
+            events[i] = status
+            if received == 0:
+                events[i + 1] = b
+                events[i + 2] = 0
+            else:
+                events[i + 1] = data1
+                events[i + 2] = b
+
+            received = 0
+            count += 1
+            if count == self.EVENTS:
+                break
+
+        self.running_status = status
+        self.data_needed = needed
+        self.data_count = received
+        self.data1 = data1
+        self.event_count = count
+        return pos
+
+
+    # Get the tempo by MIDI clock
+    #   RETURN:: beats per minute (0: unknown)
+    def get_clock_tempo( self ):
+        if self.clock_interval_us == 0:
+            return 0
+
+        return 60000000 // (self.clock_interval_us * self.CLOCK_PPQN)
+
+
+    # Estimate the time of a clock pulse by the last pulse and the tempo
+    #   pulse:: clock pulse number since Start
+    #
+    #   RETURN:: time (ticks_us) of the pulse
+    def clock_time( self, pulse ):
+        return time.ticks_add(self.clock_us, (pulse - self.clock_pulses) * self.clock_interval_us)
+
+
+    # Is a message being received
+    #   RETURN:: True: waiting for the rest of a message
+    def in_message( self ):
+        return self.data_count > 0 or self.skip_bytes > 0
+
+
+class midi_uart_class:
+
+    # Constructor
+    #   uart:: UART receiving MIDI
+    #   size:: ring buffer size (power of 2)
+    #   drain_ms:: period (ms) of the timer draining UART where UART.irq is not available
+    def __init__( self, uart, size = 512, drain_ms = 2 ):
+        self.uart = uart
+        self.ring = bytearray(size)
+        self.ring_mask = size - 1
+        self.ring_head = 0                                  # Next index to write (written by the interrupt only)
+        self.ring_tail = 0                                  # Next index to read (written by readinto() only)
+        self.chunk = bytearray(32)                          # Bytes read from UART at once in the interrupt
+        self.received = 0                                   # Bytes received
+        self.overflows = 0                                  # Bytes dropped because the ring buffer is full
+
+        # UART RX interrupt, otherwise a timer drains UART
+        self.timer = None
+        self.handler = self.on_receive
+        trigger = getattr(UART, "IRQ_RXIDLE", None)
+        try:
+            if trigger is None:
+                raise AttributeError("UART.irq")
+            self.uart.irq(handler = self.handler, trigger = trigger)
+        except (AttributeError, TypeError, ValueError):
+            self.timer = Timer(mode = Timer.PERIODIC, period = drain_ms, callback = self.handler)
+
+
+    # Interrupt handler: move bytes in UART to the ring buffer.
+    #   src:: UART or Timer calling this
+    def on_receive( self, src = None ):
+        ring = self.ring
+        mask = self.ring_mask
+        chunk = self.chunk
+        n = self.uart.any()
+        while n > 0:
+            if n > len(chunk):
+                n = len(chunk)
+            n = self.uart.readinto(chunk, n)
+            if not n:
+                break
+
+            head = self.ring_head
+            for i in range(n):
+                nxt = (head + 1) & mask
+                if nxt == self.ring_tail:
+                    self.overflows += 1
+                else:
+                    ring[head] = chunk[i]
+                    head = nxt
+
+            self.ring_head = head
+            self.received += n
+            n = self.uart.any()
+
+
+    # Number of bytes in the ring buffer
+    def any( self ):
+        return (self.ring_head - self.ring_tail) & self.ring_mask
+
+
+    # Read bytes from the ring buffer.
+    #   buf:: buffer to read into
+    #
+    #   RETURN:: number of bytes read
+    def readinto( self, buf ):
+        ring = self.ring
+        mask = self.ring_mask
+        head = self.ring_head
+        tail = self.ring_tail
+        n = 0
+        size = len(buf)
+        while tail != head and n < size:
+            buf[n] = ring[tail]
+            tail = (tail + 1) & mask
+            n += 1
+
+        self.ring_tail = tail
+        return n
+
+
+    # Get receive statistics
+    #   RETURN:: (bytes received, bytes dropped by the ring buffer overflow)
+    def get_stats( self ):
+        return (self.received, self.overflows)
+
+
+    # Clear receive statistics
+    def clear_stats( self ):
+        self.received = 0
+        self.overflows = 0
+
+
+    # Stop the interrupt
+    def deinit( self ):
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+        else:
+            self.uart.irq(handler = None)
+
+
+class midi_out_class:
+
+    # Constructor
+    #   uart:: UART sending MIDI
+    #   size:: ring buffer size (power of 2)
+    #   baudrate:: UART baud rate
+    #   ahead_bytes:: bytes written to UART ahead of the line (UART TX FIFO size)
+    def __init__( self, uart, size = 256, baudrate = 31250, ahead_bytes = 32 ):
+        self.uart = uart
+        self.ring = bytearray(size)
+        self.ring_mv = memoryview(self.ring)
+        self.ring_mask = size - 1
+        self.ring_head = 0                                  # Next index to put
+        self.ring_tail = 0                                  # Next index to write to UART
+        self.BYTE_US = 10000000 // baudrate                 # Time to send a byte (start + 8 bits + stop)
+        self.AHEAD_US = ahead_bytes * self.BYTE_US
+        self.line_free_us = 0                               # Time (ticks_us) when the bytes written are sent
+        self.status = 0                                     # Running status sent (0: unknown)
+        self.sent = 0                                       # Bytes written to UART
+        self.overflows = 0                                  # Bytes dropped because the ring buffer is full
+
+        # Number of data bytes each status (index: status >> 4 - 8)
+        self.DATA_BYTES = bytes([2, 2, 2, 2, 1, 1, 2, 0])   # 0x8n, 0x9n, 0xAn, 0xBn, 0xCn, 0xDn, 0xEn, 0xFn
+
+
+    # Room in the ring buffer
+    def room( self ):
+        return (self.ring_tail - self.ring_head - 1) & self.ring_mask
+
+
+    # Put MIDI bytes received to send as they are (THRU).
+    # The bytes are copied by memoryview slices, not byte by byte.
+    #   buf:: MIDI bytes (bytearray or memoryview)
+    #   length:: number of bytes
+    #
+    #   RETURN:: True: put / False: dropped (the ring buffer is full)
+    def thru( self, buf, length ):
+        if length > self.room():
+            self.overflows += length
+            return False
+
+        # The running status of the stream is not known
+        self.status = 0
+
+        mv = buf if isinstance(buf, memoryview) else memoryview(buf)
+        head = self.ring_head
+        n = len(self.ring) - head
+        if n >= length:
+            self.ring_mv[head:head + length] = mv[0:length]
+        else:
+            self.ring_mv[head:] = mv[0:n]
+            self.ring_mv[0:length - n] = mv[n:length]
+
+        self.ring_head = (head + length) & self.ring_mask
+        return True
+
+
+    # Put a channel message to send (merge), the status is omitted by the running status.
+    #   status, data1, data2:: message bytes
+    #
+    #   RETURN:: True: put / False: dropped (the ring buffer is full)
+    def send( self, status, data1, data2 ):
+        data = self.DATA_BYTES[(status >> 4) - 8]
+        length = data if status == self.status else data + 1
+        if length > self.room():
+            self.overflows += length
+            return False
+
+        ring = self.ring
+        mask = self.ring_mask
+        head = self.ring_head
+        if status != self.status:
+            ring[head] = status
+            head = (head + 1) & mask
+            self.status = status
+
+        ring[head] = data1
+        head = (head + 1) & mask
+        if data == 2:
+            ring[head] = data2
+            head = (head + 1) & mask
+
+        self.ring_head = head
+        return True
+
+
+    # Write the bytes in the ring buffer to UART as many as the line can send now.
+    #   RETURN:: bytes written
+    def flush( self ):
+        head = self.ring_head
+        tail = self.ring_tail
+        if head == tail:
+            return 0
+
+        # Bytes the line can take now
+        now = time.ticks_us()
+        ahead = time.ticks_diff(self.line_free_us, now)
+        if ahead < 0:
+            ahead = 0
+            self.line_free_us = now
+        n = (self.AHEAD_US - ahead) // self.BYTE_US
+        if n <= 0:
+            return 0
+
+        # Contiguous bytes in the ring buffer
+        pending = (head - tail) & self.ring_mask
+        if n > pending:
+            n = pending
+        if n > len(self.ring) - tail:
+            n = len(self.ring) - tail
+
+        n = self.uart.write(self.ring_mv[tail:tail + n]) or 0
+        self.ring_tail = (tail + n) & self.ring_mask
+        self.line_free_us = time.ticks_add(self.line_free_us, n * self.BYTE_US)
+        self.sent += n
+        return n
+
+
+    # Get send statistics
+    #   RETURN:: (bytes sent, bytes dropped by the ring buffer overflow)
+    def get_stats( self ):
+        return (self.sent, self.overflows)
+
+
+    # Clear send statistics
+    def clear_stats( self ):
+        self.sent = 0
+        self.overflows = 0
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+##################################################################################
+# Write-behind persistence for YMF825 synthesizer with Raspberry Pi PICO.
+#
+#   SAVE menus mark the records edited as dirty instead of writing the file,
+#   and the engine saves a dirty record at a time when it is idle (step()).
+#   A record is saved in steps (journal append, commit mark, patches, sync),
+#   step() runs a step of the save at a time, so the engine checks MIDI between them.
+#   A record marked again before it is saved is saved once (coalesced),
+#   and the records are saved after they are not marked for a while.
+#   finish() completes the save in progress (before another databank transaction),
+#   flush() saves all the dirty records at once (databank change, shutdown).
+#
+#   Dirty records are bits of an integer each kind of the records (record n: bit n).
+#
+# Copyright (c) by Shunsuke Ohira
+#   01.000 2026/10/16: Dirty record bitmasks saved in idle slices
+#   01.001 2026/10/16: A record is saved in steps, a step each idle slice
+#   01.002 2026/10/16: Any error of a save is counted as a failure
+#   01.003 2026/10/16: A record failed to save is saved again (a few times)
+##################################################################################
+
+from array import array
+import time
+
+class persistence_class:
+
+    # Constructor
+    #   savers:: [function(n) returning the steps (generator) saving the record n, ...] each kind of the records
+    #   delay_ms:: time (ms) to wait for the next mark before saving
+    #   retries:: times to save a record again after its save failed
+    def __init__( self, savers, delay_ms = 500, retries = 3 ):
+        self.savers = savers
+        self.KINDS = len(savers)
+        self.DELAY_MS = delay_ms
+        self.RETRIES = retries
+        self.dirty = array('I', [0] * self.KINDS)           # Dirty records each kind (record n: bit n)
+        self.marked_ms = 0                                  # Time (ticks_ms) of the last mark
+        self.saving = None                                  # Steps of the save in progress
+        self.saving_kind = 0                                # Record of the save in progress
+        self.saving_n = 0
+        self.fails = bytearray(self.KINDS * 32)             # Failed saves in a row each record
+        self.clear_stats()
+
+
+    # Mark a record as dirty.
+    #   kind:: index of savers
+    #   n:: record number (0..31)
+    def mark( self, kind, n ):
+        bit = 1 << n
+        if self.dirty[kind] & bit:
+            self.coalesced += 1
+        else:
+            self.dirty[kind] |= bit
+
+        self.marked_ms = time.ticks_ms()
+
+
+    # Are there dirty records or a save in progress
+    #   RETURN:: True: some records are dirty or being saved
+    def pending( self ):
+        if self.saving is not None:
+            return True
+
+        for kind in range(self.KINDS):
+            if self.dirty[kind] != 0:
+                return True
+
+        return False
+
+
+    # Run a step of the save in progress, or start saving a dirty record.
+    #   force:: True: start without waiting for the delay
+    #
+    #   RETURN:: True: a step is done / False: nothing to save now
+    def step( self, force = False ):
+        if self.saving is not None:
+            self.run_saving()
+            return True
+
+        if not force and time.ticks_diff(time.ticks_ms(), self.marked_ms) < self.DELAY_MS:
+            return False
+
+        for kind in range(self.KINDS):
+            bits = self.dirty[kind]
+            if bits == 0:
+                continue
+
+            n = 0
+            while bits & (1 << n) == 0:
+                n += 1
+
+            # Cleared before saving, a mark while saving makes it dirty again
+            self.dirty[kind] = bits & ~(1 << n)
+            self.saving_kind = kind
+            self.saving_n = n
+            self.saving = self.savers[kind]( n )
+            self.run_saving()
+            return True
+
+        return False
+
+
+    # Run a step of the save in progress.
+    # A record failed to save is marked again to retry after the delay, RETRIES times in a row at most.
+    def run_saving( self ):
+        r = self.saving_kind * 32 + self.saving_n
+        try:
+            next( self.saving )
+        except StopIteration:
+            self.saving = None
+            self.saved += 1
+            self.fails[r] = 0
+        except Exception as e:
+            print(e)
+            self.saving = None
+            self.failed += 1
+            if self.fails[r] < self.RETRIES:
+                self.fails[r] += 1
+                self.dirty[self.saving_kind] |= 1 << self.saving_n
+                self.marked_ms = time.ticks_ms()
+            else:
+                # Given up, the record is saved when it is marked again
+                self.fails[r] = 0
+
+
+    # Complete the save in progress.
+    def finish( self ):
+        while self.saving is not None:
+            self.run_saving()
+
+
+    # Save all the dirty records.
+    #   RETURN:: number of the records saved
+    def flush( self ):
+        saved = self.saved
+        while self.step( True ):
+            pass
+
+        return self.saved - saved
+
+
+    # Get save statistics
+    #   RETURN:: (records saved, marks coalesced, saves failed)
+    def get_stats( self ):
+        return (self.saved, self.coalesced, self.failed)
+
+
+    # Clear save statistics
+    def clear_stats( self ):
+        self.saved = 0
+        self.coalesced = 0
+        self.failed = 0
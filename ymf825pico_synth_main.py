@@ -44,13 +44,83 @@
 #   01.500 2023/09/21: MIDI channel can be assigned to each timbre portion
 #   01.501 2023/09/22: Ignore Realtime Clock (0xF8) and Active Sensing (0xFE) in MIDI message (too much!!)
 #   01.502 2023/09/23: Waiting for receiving parfect MIDI messages via UART to never lost MIDI message
+#   01.600 2026/10/16: SPI register writes are queued and flushed once per MIDI batch or score row
+#   01.601 2026/10/16: MIDI bytes are read in bulk and parsed with running status, SysEx and real time messages are dropped
+#   01.602 2026/10/16: MIDI bytes are received into a ring buffer by UART interrupt
+#   01.603 2026/10/16: MIDI channel to timbre portion routing table with key ranges
+#   01.700 2026/10/16: Synthesizer engine (MIDI, voices, SPI) works on core 1, UI works on core 0
+#   01.701 2026/10/16: uasyncio tasks (MIDI, encoders, display, sequencer, persistence) as an alternative to the engine thread
+#   01.702 2026/10/16: Rotary encoders are decoded by Pin IRQ
+#   01.703 2026/10/16: Rotary encoder acceleration, steps in a UI frame are handled as one change
+#   01.704 2026/10/16: Timestamped event queue for live MIDI and score notes dispatched by the engine loop
+#   01.705 2026/10/16: Score steps follow MIDI clock (#CLOCKS=pulses per step) while it is running
+#   01.706 2026/10/16: MIDI THRU/merge output on UART TX
+#   01.707 2026/10/16: Tone names and tone copy use the databank archive
+#   01.708 2026/10/16: SAVE menus save the record edited only
+#   01.709 2026/10/16: Write-behind persistence, the engine saves the records edited when it is idle
+#   01.710 2026/10/16: Engine thread keeps working after an error, engine_call() raises the error of the call
+#   01.711 2026/10/16: Tone and equalizer bursts wait for YMF825 as engine jobs without blocking MIDI
+#   01.712 2026/10/16: Confirmation values (NO, SURE?, YES) move one value a UI frame
+#   01.713 2026/10/16: Score step time starts again after #DATABANK and #TIMBRE commands
+#   01.714 2026/10/16: The playing timbre is sent again when a tone it plays is overwritten by TONE COPY
+#   01.715 2026/10/16: A record is saved in steps between MIDI checks, renames are done by the engine
+#   01.716 2026/10/16: TONE COPY finishes the save in progress and writes the tone in one engine call
+#   01.717 2026/10/16: Live MIDI events are dispatched at once when the event queue is full of future events
+#   01.718 2026/10/16: Score #TIMBRE sends the tones and the volumes of the timbre number (int)
+#   01.719 2026/10/16: Tone names of a databank are read by the engine (the archive file is not shared with the UI)
+#   01.720 2026/10/16: Live MIDI events are dropped and counted (never written to the chip out of the dispatcher) when the event queue is full of future events
+#   01.721 2026/10/16: Tone copies for editing and equalizer edits are done by the engine
+#   01.722 2026/10/16: uasyncio sequencer and persistence run as their own tasks with time budgets
 #############################################################################
 
 from ymf825pico import ymf825pico_class
+from ymf825pico_midi import midi_parser_class, midi_uart_class, midi_out_class
+from ymf825pico_encoder import rotary_encoder_class
+from ymf825pico_event import event_queue_class
+from ymf825pico_databank import NAME_TONE, NAME_TIMBRE, NAME_EQUALIZER
+from ymf825pico_persist import persistence_class
 from machine import Pin, I2C, SPI, UART
 import ssd1306
-import time, os, json, math
+import time, os, math
 import gc
+import _thread
+import uasyncio as asyncio
+
+# Synthesizer engine
+#   True: the engine works on core 1 by _thread, UI works on core 0
+#   False: the engine and UI work as uasyncio tasks on core 0
+ENGINE_THREAD = True
+
+# uasyncio task time budgets (ms), a task yields to the others after working for the budget
+MIDI_TASK_BUDGET_MS = 4
+SEQUENCER_TASK_BUDGET_MS = 2
+PERSIST_TASK_BUDGET_MS = 2
+DISPLAY_TASK_PERIOD_MS = 20
+SEQUENCER_TASK_PERIOD_MS = 10           # Longest sleep of the sequencer task (to find a score started)
+PERSIST_TASK_PERIOD_MS = 20             # Sleep of the persistence task when nothing is saved
+
+# Write-behind persistence (records saved by the engine when it is idle)
+PERSIST_TONE = 0                        # Kinds of the records
+PERSIST_TIMBRE = 1
+PERSIST_EQUALIZER = 2
+PERSIST_TONE_NAME = 3
+PERSIST_TIMBRE_NAME = 4
+PERSIST_EQUALIZER_NAME = 5
+PERSIST_DELAY_MS = 500                  # A record is saved after it is not saved again for this time
+PERSIST_IDLE_US = 20000                 # A step of a save is done when no event is due in this time
+persistence = None
+
+# Timestamped event queue dispatched by the engine (live MIDI and score events)
+#   Status 0x80..0xEF: MIDI channel message, 0x00..0x7F: event of this synthesizer
+EVENT_QUEUE_SIZE = 64
+EVENT_NOTE_OFF = 0x00                   # | timbre portion, data1 = note
+EVENT_NOTE_ON  = 0x10                   # | timbre portion, data1 = note, data2 = velocity
+SEQUENCER_LEAD_US = 5000                # Score steps are posted to the event queue ahead of their time
+SEQUENCER_CLOCK_SYNC = True             # True: score steps follow MIDI clock while it is running
+event_queue = event_queue_class(EVENT_QUEUE_SIZE)
+
+# MIDI parser of the engine (MIDI clock is tracked by it)
+midi_parser = midi_parser_class()
 
 # UART test
 UART_CH = 0
@@ -59,6 +129,15 @@ UART_RX = 1   # GPIO No.
 #UART_BAUDRATE = 9600
 UART_BAUDRATE = 31250      # MIDI speed
 
+# MIDI OUT (UART TX)
+#   MIDI_OUT_THRU: MIDI bytes received are sent as they are (to chain another YMF825pico)
+#   MIDI_OUT_MERGE: MIDI channel messages received and score notes (portion n to MIDI CH n+1) are sent
+MIDI_OUT_OFF = 0
+MIDI_OUT_THRU = 1
+MIDI_OUT_MERGE = 2
+MIDI_OUT = MIDI_OUT_OFF
+midi_out = None
+
 # I2C for SSD1306 OLED Display
 I2C_SSD1306_CH = 0
 I2C_SSD1306_SDA = 20    # Pin24
@@ -78,13 +157,16 @@ display = None
 i2c_ssd1306 = I2C(I2C_SSD1306_CH, sda=Pin(I2C_SSD1306_SDA), scl=Pin(I2C_SSD1306_SCL))
 
 # Rotary encoders
+#   ACCEL: True = fast turns make larger steps (confirmation values NO/SURE?/YES move one value a frame)
 ROTARY_ENCODERS = [
-    # No.     GPIO No.                Pin objects                 Previous pin values       Pjn values             Pin No.
-    {"NO": 0, "A_PIN": 2, "B_PIN": 3, "A_SW": None, "B_SW": None, "A_PREV": 2, "B_PREV": 2, "VALUES": [0,0,0,0]},  # Pin 4,  5
-    {"NO": 1, "A_PIN": 4, "B_PIN": 5, "A_SW": None, "B_SW": None, "A_PREV": 2, "B_PREV": 2, "VALUES": [0,0,0,0]},  # Pin 6,  7
-    {"NO": 2, "A_PIN": 6, "B_PIN": 7, "A_SW": None, "B_SW": None, "A_PREV": 2, "B_PREV": 2, "VALUES": [0,0,0,0]},  # Pin 9, 10
-    {"NO": 3, "A_PIN": 8, "B_PIN": 9, "A_SW": None, "B_SW": None, "A_PREV": 2, "B_PREV": 2, "VALUES": [0,0,0,0]}   # Pin11, 12
+    # No.     GPIO No.                Accelerate        Pin No.
+    {"NO": 0, "A_PIN": 2, "B_PIN": 3, "ACCEL": False},  # Pin 4,  5
+    {"NO": 1, "A_PIN": 4, "B_PIN": 5, "ACCEL": True },  # Pin 6,  7
+    {"NO": 2, "A_PIN": 6, "B_PIN": 7, "ACCEL": True },  # Pin 9, 10
+    {"NO": 3, "A_PIN": 8, "B_PIN": 9, "ACCEL": True }   # Pin11, 12
 ]
+rotary_encoders = None                  # Pin IRQ quadrature decoder
+ENCODER_POLL_MS = 20                    # UI frame: the steps in a frame are handled as one change
 
 # Timbre portion's volumes10/2go,10/3event,10/4back
 timbre_volumes = [1.0] * 4
@@ -400,7 +482,7 @@ GUI_EDITOR = [
 
 
 # Show menu
-# item_move_dir: 1=item list down, -1=item list up
+# item_move_dir: plus=item list down, minus=item list up (the steps moved)
 # slide: Number of characters to slide the vertical line diveding the item and value regions
 # str_head: True = Get the item string from head / Faluse = from tail
 item_menu_display_start = 0
@@ -457,7 +539,7 @@ def show_menu(item_move_dir, slide=0, str_head=True):
 #                    print("NEXT ITEM MENU=", gui_item_menu_exit)
 
                 gui["func"](gui)
-                display.show()
+                display_show()
                 return
 
     # Text Editor Menu
@@ -471,10 +553,10 @@ def show_menu(item_move_dir, slide=0, str_head=True):
         menu_s = 0
     elif menu_item >= items - DISPLAY_MENU_LINES:
         menu_s = items - DISPLAY_MENU_LINES
-    elif item_move_dir == 1 and menu_item >= item_menu_display_start + DISPLAY_MENU_LINES:
-        menu_s = item_menu_display_start + 1
-    elif item_move_dir == -1 and menu_item < item_menu_display_start:
-        menu_s = item_menu_display_start - 1
+    elif item_move_dir > 0 and menu_item >= item_menu_display_start + DISPLAY_MENU_LINES:
+        menu_s = menu_item - DISPLAY_MENU_LINES + 1
+    elif item_move_dir < 0 and menu_item < item_menu_display_start:
+        menu_s = menu_item
     else:
         menu_s = item_menu_display_start
 
@@ -501,7 +583,18 @@ def show_menu(item_move_dir, slide=0, str_head=True):
         display.text(value_name, v_divide + 2, y, True)
         y += DISPLAY_LINE_HEIGHT
 
-    display.show()
+    display_show()
+
+
+# Send the display buffer to the OLED (the display task sends it in uasyncio mode)
+display_dirty = False
+def display_show():
+    global display_dirty
+
+    if ENGINE_THREAD:
+        display.show()
+    else:
+        display_dirty = True
 
 
 # Clear list memory for SYNTH_MENU
@@ -644,21 +737,21 @@ def on_select_timbre():
 
     # All notes off
     if menu_item == 0:
-        YMF825pico.all_notes_off()
+        engine_call(YMF825pico.all_notes_off)
 
     # Set new timbre to YMF825pico class, then send a change timbre command to YMF825
     else:
 #        print("CHANGE TIMBRE TO ", SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["name"])
         timbre = menu_item - 1
-        YMF825pico.set_synth_play_timbre(timbre)
-        YMF825pico.set_timbre_tones(timbre)
+        engine_call(YMF825pico.set_synth_play_timbre, timbre)
+        engine_call(chip_start, YMF825pico.set_timbre_tones_steps(timbre))
         for prt in list(range(YMF825pico.TIMBRE_PORTIONS)):
             timbre_volumes[prt] = YMF825pico.get_timbre_volume(timbre, prt) / 31.0
 
 
 # Set an equalizer
 def on_set_equalizer():
-    YMF825pico.set_synth_equalizer(menu_item)
+    engine_call(chip_start, YMF825pico.set_synth_equalizer_steps(menu_item))
 
 
 # Play a demo score
@@ -670,7 +763,7 @@ def on_play_demo(demo=None, clear_menu_value=True):
         demo = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["name"]
 
 #    print("PLAY DEMO=", demo)
-    piano_role_player(score_file=demo + ".txt")
+    play_score(demo + ".txt")
 #    print("DEMO END:", menu_category, menu_item, SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["selected"])
     if clear_menu_value:
         SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["selected"] = 0
@@ -682,6 +775,9 @@ current_databank = 0
 def load_current_databank():
     global databank_copy_to, current_databank
 
+    # Save the records edited in the databank before changing it
+    engine_call(persistence.flush)
+
     # Load databak
     YMF825pico.set_databank(current_databank)
     # Load tone data
@@ -699,7 +795,7 @@ def on_change_databank():
     current_databank = menu_item
     databank_copy_to = menu_item
 #    print("LOAD DATABANK=", YMF825pico.get_databank(), "/", databank)
-    load_current_databank()
+    engine_call(load_current_databank)
 
     menu_value = 0
     make_select_databank_menu(menu_category, menu_category)
@@ -749,7 +845,7 @@ def on_cancel_timbre_name():
     show_menu(0)
 
 
-# Change a timbre name and save all timbre data
+# Change a timbre name and save it
 def on_save_timbre_name():
     global menu_main, menu_category, menu_item, menu_value
 
@@ -760,11 +856,10 @@ def on_save_timbre_name():
         name += ch if ch != CHARS_LIST[0] else SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i]["name"]
 
 #    print("CHANGE TIMBRE NAME[{}]={}".format(menu_category, name))
-    YMF825pico.rename_timbre(menu_category, name)
+    engine_call(YMF825pico.rename_timbre, menu_category, name)
 
     # Save tone data
-    YMF825pico.save_timbre_data()
-    gc.collect()
+    persist(PERSIST_TIMBRE_NAME, menu_category)
 
     # Initialize the TONE NAME menu
     make_edit_timbre_name_menu(menu_main, menu_main)
@@ -846,17 +941,7 @@ def values_tone_names_in_databank(databank):
 
     #  SOS: Load tone name list in the databank
 #    print("DATABANK = ", databank)
-    try:
-        file = open( "YMF825ToneName" + str(databank) + ".txt", encoding = YMF825pico.file_encode )
-    except OSError as e:
-#        print(e)
-        tone_list = []
-    else:
-        tone_list = json.load(file)
-        file.close()
-        
-    file = None
-    gc.collect()
+    tone_list = engine_call(YMF825pico.get_databank_tone_names, databank)
 
     # Set value list for the timbre portion
     values_tone = []
@@ -901,25 +986,24 @@ def on_save_timbre_edit():
     for portion in list(range(YMF825pico.TIMBRE_PORTIONS)):
         i = portion * 6
         databank = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i]["selected"]
-        YMF825pico.set_timbre_portion_databank(menu_category, portion, databank)
+        engine_call(YMF825pico.set_timbre_portion_databank, menu_category, portion, databank)
 
         tone = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+1]["selected"]
-        YMF825pico.set_timbre_portion_tone(menu_category, portion, tone)
+        engine_call(YMF825pico.set_timbre_portion_tone, menu_category, portion, tone)
 
         vfrom = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+2]["selected"]
         vto   = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+3]["selected"]
-        YMF825pico.set_timbre_voice_range(menu_category, portion, vfrom, vto)
+        engine_call(YMF825pico.set_timbre_voice_range, menu_category, portion, vfrom, vto)
 
         volume = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+4]["selected"]
-        YMF825pico.set_timbre_portion_volume(menu_category, portion, volume)
+        engine_call(YMF825pico.set_timbre_portion_volume, menu_category, portion, volume)
 
 #        midich = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+5]["selected"]
 #        YMF825pico.set_timbre_portion_midich(menu_category, portion, midich)
-        YMF825pico.set_timbre_portion_midich(menu_category, portion, SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+5]["selected"] + 1)
+        engine_call(YMF825pico.set_timbre_portion_midich, menu_category, portion, SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i+5]["selected"] + 1)
 
     # Save timbre data
-    YMF825pico.save_timbre_data()
-    gc.collect()
+    persist(PERSIST_TIMBRE, menu_category)
     on_cancel_timbre_edit()
 
 
@@ -972,7 +1056,7 @@ def on_cancel_tone_name():
     show_menu(0)
 
 
-# Change a tone name and save all tone data
+# Change a tone name and save it
 def on_save_tone_name():
     global menu_main, menu_category, menu_item, menu_value
 
@@ -983,11 +1067,10 @@ def on_save_tone_name():
         name += ch if ch != CHARS_LIST[0] else SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i]["name"]
 
 #    print("CHANGE TONE NAME[{}]={}".format(menu_category, name))
-    YMF825pico.rename_tone(menu_category, name)
+    engine_call(YMF825pico.rename_tone, menu_category, name)
 
     # Save tone data
-    YMF825pico.save_tone_data()
-    gc.collect()
+    persist(PERSIST_TONE_NAME, menu_category)
 
     # Initialize the TONE NAME menu
     make_edit_tone_name_menu(menu_main, menu_main)
@@ -1014,7 +1097,7 @@ def on_select_tone_edit_tone(menu, prev_menu):
     clear_menu_memory(prev_menu, False, True, True)
 
     # Get tone data for editing
-    tone_hash = YMF825pico.copy_tone_data_for_edit(menu_category)
+    tone_hash = engine_call(YMF825pico.copy_tone_data_for_edit, menu_category)
 #    print("TONE HASH[{}]:".format(menu_category))
 
     values_parm = []
@@ -1049,9 +1132,9 @@ def on_select_tone_edit_tone(menu, prev_menu):
     SYNTH_MENU[MAIN_MENU_TONE_EDIT]["CATEGORY"][menu_category]["ITEM"] = item
 
     # Set EDITING Timbre
-    YMF825pico.save_edited_data_to_tone(0)
-    YMF825pico.set_synth_play_timbre(0)
-    YMF825pico.set_timbre_tones(0)
+    engine_call(YMF825pico.save_edited_data_to_tone, 0)
+    engine_call(YMF825pico.set_synth_play_timbre, 0)
+    engine_call(chip_start, YMF825pico.set_timbre_tones_steps(0))
     for prt in list(range(YMF825pico.TIMBRE_PORTIONS)):
         timbre_volumes[prt] = YMF825pico.get_timbre_volume(0, prt) / 31.0
 
@@ -1094,10 +1177,10 @@ def reflect_tone_edit(force_save = False):
 #        for parm in parm_hash.keys():
 #            print("PARM[{}] = {}".format(parm, parm_hash[parm]))
 
-        YMF825pico.set_editing_tone(parm_hash)
-        YMF825pico.save_edited_data_to_tone(0)
-        YMF825pico.set_synth_play_timbre(0)
-        YMF825pico.set_timbre_tones(0)
+        engine_call(chip_start, YMF825pico.set_editing_tone_steps(parm_hash))
+        engine_call(YMF825pico.save_edited_data_to_tone, 0)
+        engine_call(YMF825pico.set_synth_play_timbre, 0)
+        engine_call(chip_start, YMF825pico.set_timbre_tones_steps(0))
         prev_parm_hash = parm_hash.copy()
         return True
     else:
@@ -1105,12 +1188,11 @@ def reflect_tone_edit(force_save = False):
         return False
 
 
-# Save the all tone data to the current databank
+# Save the tone edited to the current databank
 def on_save_tone_edit():
     if reflect_tone_edit(True):
-        YMF825pico.save_edited_data_to_tone(menu_category)
-        YMF825pico.save_tone_data()
-        gc.collect()
+        engine_call(YMF825pico.save_edited_data_to_tone, menu_category)
+        persist(PERSIST_TONE, menu_category)
 
     on_play_demo("demo1", False)
     on_cancel_tone_edit()
@@ -1172,16 +1254,7 @@ def on_select_tone_copy_tone(menu, prev_menu):
         {"name": "YES", "on_select": on_change_copy_parm, "on_selected": None}
     ]
 
-    try:
-        file = open( "YMF825ToneName" + str(databank_copy_to) + ".txt", encoding = YMF825pico.file_encode )
-    except OSError as e:
-#        print(e)
-        tone_list = []
-    else:
-        tone_list = json.load(file)
-        file.close()
-        
-    file = None
+    tone_list = engine_call(YMF825pico.get_databank_tone_names, databank_copy_to)
 
 #    tone_list = YMF825pico.get_synth_tone_names()
     for tone in tone_list:
@@ -1202,6 +1275,16 @@ def on_change_databank_copy_to():
     on_select_tone_copy_tone(menu_item, -1)
 
 
+# Write a tone in a databank after the save in progress (in the engine)
+# The engine never starts another save between them.
+#   databank:: databank to write to
+#   tone:: tone index to write to
+#   parm:: tone parameters made by make_sound_param()
+def copy_tone_to_databank(databank, tone, parm):
+    persistence.finish()
+    YMF825pico.save_tone_to_databank(databank, tone, parm)
+
+
 # Copy a tone to another one in the selected databank
 def on_change_copy_parm():
     global databank_copy_to
@@ -1210,37 +1293,19 @@ def on_change_copy_parm():
     tone_copy_to = menu_item - 1
 #    print("Copy tone {} to DATABANK{}:{}.".format(menu_category, databank_copy_to, tone_copy_to))
 
-    # Load the databank tones to copy to
-    try:
-        file = open("YMF825ToneParm" + str(databank_copy_to) + ".txt", encoding = YMF825pico.file_encode)
-    except OSError as e:
-#        print(e)
-        return
-    else:
-        tone_parm = json.load(file)
-        file.close()
-        
     # Get tone data for editing
-    tone_hash = YMF825pico.copy_tone_data_for_edit(menu_category)
-    sound_param = YMF825pico.make_sound_param(tone_hash)
-#    print("DATABANK TONES=", tone_parm)
+    tone_hash = engine_call(YMF825pico.copy_tone_data_for_edit, menu_category)
+    sound_param = engine_call(YMF825pico.make_sound_param, tone_hash)
 #    print("TONE TO COPY  =", tone_hash)
 #    print("PARM TO COPY  =", sound_param)
-    tone_parm[tone_copy_to] = sound_param
-#    print("COPY PARAMS   =", tone_parm)
 
-    try:
-        file = open("YMF825ToneParm" + str(databank_copy_to) + ".txt", "w", encoding = YMF825pico.file_encode)
-    except OSError as e:
-        pass
-#        print(e)
-    else:
-        json.dump(tone_parm, file)
-        file.close()
+    # Write the tone in the databank archive (and in the current databank) after the save in progress
+    engine_call(copy_tone_to_databank, databank_copy_to, tone_copy_to, sound_param)
 
-    # Reload tone data
-    if current_databank == databank_copy_to:
-        load_current_databank()
+    # The playing timbre sounds the new tone
+    timbre = YMF825pico.get_synth_play_timbre()
+    if YMF825pico.timbre_uses_tone(timbre, databank_copy_to, tone_copy_to):
+        engine_call(chip_start, YMF825pico.set_timbre_tones_steps(timbre))
 
 #        print("TONE HASH[{}]:".format(menu_category))
 #        YMF825pico.set_editing_tone(tone_hash)
@@ -1287,11 +1352,10 @@ def on_save_equalizer_name():
         name += ch if ch != CHARS_LIST[0] else SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][i]["name"]
 
 #    print("CHANGE EQUALIZER NAME[{}]={}".format(menu_category, name))
-    YMF825pico.rename_equalizer(menu_category, name)
+    engine_call(YMF825pico.rename_equalizer, menu_category, name)
 
     # Save equalizer data
-    YMF825pico.save_equalizer_data()
-    gc.collect()
+    persist(PERSIST_EQUALIZER_NAME, menu_category)
 
     # Initialize the TONE NAME menu
     make_edit_equalizer_name_menu(menu_main, menu_main)
@@ -1441,7 +1505,7 @@ def on_calc_biquad_filter():
 def on_change_equalizer_parameter():
     # Set equalizer and play demo
     save_equalizer_edit()
-    YMF825pico.set_synth_equalizer(menu_category)
+    engine_call(chip_start, YMF825pico.set_synth_equalizer_steps(menu_category))
     on_play_demo("demo1", False)
 
 
@@ -1500,15 +1564,14 @@ def save_equalizer_edit():
 #    print("SAVE EQ0[", menu_category, "]=", eq0)
 #    print("SAVE EQ1[", menu_category, "]=", eq1)
 #    print("SAVE EQ2[", menu_category, "]=", eq2)
-    YMF825pico.save_edited_data_to_equalizer( menu_category, eq0, eq1, eq2 )
+    engine_call(YMF825pico.save_edited_data_to_equalizer, menu_category, eq0, eq1, eq2)
 
 
 # Save the edited equalize parameters
 def on_save_equalizer_edit():
     save_equalizer_edit()
-    YMF825pico.save_equalizer_data()
-    gc.collect()
-    YMF825pico.set_synth_equalizer(menu_category)
+    persist(PERSIST_EQUALIZER, menu_category)
+    engine_call(chip_start, YMF825pico.set_synth_equalizer_steps(menu_category))
 
 
 # Cancel equalizer parameters edited
@@ -1607,33 +1670,16 @@ SYNTH_MENU = [
 
 
 # Get a rotary encoder status
-# rte: {"NO": ?, "A_PIN": gpio, "B_PIN": gpio, "A_SW": pin object, "B_SW": pin object, "A_PREV": ?, "B_PREV": ?, "VALUES": [0,0,0,0]}
+# rte: {"NO": ?, "A_PIN": gpio, "B_PIN": gpio}
 # RETURN:
-#   1=count up
-#  -1=count down
-#   0=stay
+#   steps turned since the last call (plus: count up, minus: count down, 0: stay)
 def get_a_rotary_encoder(rte):
-    a = rte["A_SW"].value()
-    b = rte["B_SW"].value()
-    time.sleep(0.001)
-    if rte["A_PREV"] != a or rte["B_PREV"] != b:
-        del rte["VALUES"][0]
-        rte["VALUES"].append(rte["A_PREV"] * 8 + rte["B_PREV"] * 4 + a * 2 + b)
-        rte["A_PREV"] = a
-        rte["B_PREV"] = b
-#        print("A, B=", a, b)
-#        print("BUF[{}]={},{},{},{}".format(rte["NO"], bin(rte["VALUES"][0]), bin(rte["VALUES"][1]), bin(rte["VALUES"][2]), bin(rte["VALUES"][3])))
-
-        if rte["VALUES"] == [0b1101, 0b0100, 0b0010, 0b1011]:
-            return 1
-        
-        if rte["VALUES"] == [0b1110, 0b1000, 0b0001, 0b0111]:
-            return -1
-
-    return 0
+    return rotary_encoders.get_steps(rte["NO"])
 
 
 # Get rotary encoders' status
+#   Steps turned in a UI frame are coalesced into one change each encoder,
+#   so the events and the menu drawing run once a frame.
 def get_rotary_encoders():
     global menu_main, menu_category, menu_item, menu_value
     global gui_item_menu, gui_item_menu_exit
@@ -1649,11 +1695,7 @@ def get_rotary_encoders():
             # MAIN
             if rte["NO"] == 0:
                 prev_menu = menu_main
-                menu_main += count
-                if menu_main < 0:
-                    menu_main = len(SYNTH_MENU) - 1
-                elif menu_main >= len(SYNTH_MENU):
-                    menu_main = 0
+                menu_main = (menu_main + count) % len(SYNTH_MENU)
 
                 if db_values_tone is not None:
                     del db_values_tone
@@ -1681,11 +1723,7 @@ def get_rotary_encoders():
             # CATEGORY
             elif rte["NO"] == 1:
                 prev_category = menu_category
-                menu_category += count
-                if menu_category < 0:
-                    menu_category = len(SYNTH_MENU[menu_main]["CATEGORY"]) - 1
-                elif menu_category >= len(SYNTH_MENU[menu_main]["CATEGORY"]):
-                    menu_category = 0
+                menu_category = (menu_category + count) % len(SYNTH_MENU[menu_main]["CATEGORY"])
 
                 # on select event
                 if SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["on_select"] is not None:
@@ -1706,11 +1744,7 @@ def get_rotary_encoders():
                 if gui_item_menu is None:
                     menu_len = len(SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"])
                     prev_item = menu_item
-                    menu_item += count
-                    if menu_item < 0:
-                        menu_item = menu_len - 1
-                    elif menu_item >= menu_len:
-                        menu_item = 0
+                    menu_item = (menu_item + count) % menu_len
 
                 # GUI editor mode
                 else:
@@ -1749,8 +1783,13 @@ def get_rotary_encoders():
             elif rte["NO"] == 3:
                 menu_len = len(SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["VALUE"])
                 val = SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["VALUE"][menu_len - 1]["name"]
+
+                # Confirmation values (NO, SURE?, YES) are not accelerated, SURE? is never skipped
+                if SYNTH_MENU[menu_main]["CATEGORY"][menu_category]["ITEM"][menu_item]["VALUE"][0]["name"] == "NO":
+                    count = 1 if count > 0 else -1
+
+                prev_value = menu_value
                 menu_value += count
-                refresh_menu = False
                 
                 # Straight forward menu
                 if val is None:
@@ -1758,15 +1797,11 @@ def get_rotary_encoders():
                         menu_value = 0
                     elif menu_value >= menu_len - 1:
                         menu_value = menu_len - 2
-                    else:
-                        refresh_menu = True
                 # Rotary menu
                 else:
-                    refresh_menu = True
-                    if menu_value < 0:
-                        menu_value = menu_len - 1
-                    elif menu_value >= menu_len:
-                        menu_value = 0
+                    menu_value %= menu_len
+
+                refresh_menu = menu_value != prev_value or val is not None
 
                 if refresh_menu:
                     # on select an item
@@ -1796,9 +1831,51 @@ def get_rotary_encoders():
 
 
 # Piano role player
-step_wait = 2.0
+#   Play a score to the end (before the engine works).
 def piano_role_player(score_file="score1.txt", file_encode="utf-8"):
-    global step_wait
+    sequencer_start(score_file, file_encode)
+    while sequencer is not None or event_queue.count > 0 or chip_busy():
+        engine_play()
+        if midi_out is not None:
+            midi_out.flush()
+
+
+# Play a score in the engine (the engine loop runs the sequencer)
+def play_score(score_file):
+    engine_call(sequencer_start, score_file)
+
+
+# Sequencer: the engine loop resumes piano_role_steps() at the time it yields
+sequencer = None                        # Generator playing a score, None: not playing
+sequencer_resume = 0                    # Time (ticks_us) to resume the sequencer
+
+# Start a score
+def sequencer_start(score_file="score1.txt", file_encode="utf-8"):
+    global sequencer, sequencer_resume
+
+    sequencer = piano_role_steps(score_file, file_encode)
+    sequencer_resume = time.ticks_us()
+
+
+# Run the sequencer if it is the time
+def sequencer_run():
+    global sequencer, sequencer_resume
+
+    if sequencer is not None and time.ticks_diff(time.ticks_us(), sequencer_resume) >= 0:
+        try:
+            sequencer_resume = next(sequencer)
+        except StopIteration:
+            sequencer = None
+
+
+# Piano role player steps
+#   Generator playing a score, posts the notes of each step to the event queue at the step time,
+#   and yields the time (ticks_us) to post the next step (SEQUENCER_LEAD_US before it).
+#   A step is step_wait seconds, or step_clocks MIDI clock pulses while MIDI clock is running.
+step_wait = 2.0
+step_clocks = 6
+def piano_role_steps(score_file="score1.txt", file_encode="utf-8"):
+    global step_wait, step_clocks
     timbre = []
     for port in list(range(YMF825pico.TIMBRE_PORTIONS)):
         timbre.append({"base": -1, "from": 0, "to": 0}) 
@@ -1810,46 +1887,55 @@ def piano_role_player(score_file="score1.txt", file_encode="utf-8"):
         else:
             return None
 
+    # Parse commands in a line
+    #   RETURN:: True: a command taking time (#DATABANK, #TIMBRE) was run
     def parse_command(line):
-        global step_wait
+        global step_wait, step_clocks
 
+        blocking = False
         while True:
             # Skip to "#"
             splt = split_by_str(line, "#")
             if splt is None:
-                return
+                return blocking
             (car, line) = splt
             
             # Read variable name
             splt = split_by_str(line, "=")
             if splt is None:
-                return
+                return blocking
             (var_name, line) = splt
             
             # Read value
             splt = split_by_str(line, ";")
             if splt is None:
-                return
+                return blocking
             (val_str, line) = splt
             try:
                 val = float(val_str)
                 if var_name == "WAIT":
                     step_wait = val
+
+                elif var_name == "CLOCKS":
+                    step_clocks = max(1, int(val))
                     
                 elif var_name == "DATABANK":
+                    blocking = True
+                    persistence.flush()
                     YMF825pico.set_databank(int(val))
                     YMF825pico.load_tone_data()
                     YMF825pico.load_timbre_data()
                     YMF825pico.load_equalizer_data()
                     
                 elif var_name == "TIMBRE":
+                    blocking = True
                     YMF825pico.set_synth_play_timbre(int(val))
-                    YMF825pico.set_timbre_tones(val)
+                    chip_start(YMF825pico.set_timbre_tones_steps(int(val)))
                     for prt in list(range(YMF825pico.TIMBRE_PORTIONS)):
-                        timbre_volumes[prt] = YMF825pico.get_timbre_volume(val, prt) / 31.0
+                        timbre_volumes[prt] = YMF825pico.get_timbre_volume(int(val), prt) / 31.0
 
             except:
-                return
+                return blocking
 
     def parse_scale(line):
         pos = 0
@@ -1898,7 +1984,7 @@ def piano_role_player(score_file="score1.txt", file_encode="utf-8"):
                     return (port, timbre[port]["base"] + pos - f)
         return (-1, 0)
 
-    def parse_score(line):
+    def parse_score(line, due):
         for pos in list(range(len(line))):
             note = line[pos]
 
@@ -1906,15 +1992,24 @@ def piano_role_player(score_file="score1.txt", file_encode="utf-8"):
             if note == "-":
                 (timbre, midi_note) = get_note_info(pos)
                 if timbre >= 0:
-                    YMF825pico.stop_by_timbre_note(timbre, midi_note)
+                    event_queue.post(due, EVENT_NOTE_OFF | timbre, midi_note, 0)
 
             # note on
             elif note.isdigit():
                 (timbre, midi_note) = get_note_info(pos)
                 if timbre >= 0:
-                    YMF825pico.stop_by_timbre_note(timbre, midi_note)
-                    YMF825pico.play_by_timbre_note(timbre, midi_note, int(int(note) * 127 / 9))
-
+                    event_queue.post(due, EVENT_NOTE_ON | timbre, midi_note, int(int(note) * 127 / 9))
+
+    # Follow MIDI clock
+    def clock_synced():
+        return SEQUENCER_CLOCK_SYNC and midi_parser.clock_running and midi_parser.clock_interval_us > 0
+
+    # Time of the step, and the clock pulse of the step following MIDI clock
+    # The time starts at the first step, and again after the commands taking time.
+    due = 0
+    rebase = True
+    pulse = -1
+    clock_starts = -1
     try:
         with open("./scores/" + score_file, "r", encoding = file_encode) as file:
             for a_line in file:
@@ -1923,11 +2018,38 @@ def piano_role_player(score_file="score1.txt", file_encode="utf-8"):
 #                print("F" + line[0] + "=" + line)
 
                 if line[0] == " ":
-                    parse_score(line)
-                    time.sleep(step_wait)
+                    if rebase:
+                        # The sequencer resumes after the YMF825 job of the commands
+                        if chip_busy():
+                            yield time.ticks_us()
+                        due = time.ticks_add(time.ticks_us(), SEQUENCER_LEAD_US)
+                        pulse = -1
+                        rebase = False
+
+                    parse_score(line, due)
+
+                    # The next step on MIDI clock (synchronized again after Start)
+                    if clock_synced():
+                        if pulse < 0 or clock_starts != midi_parser.clock_starts:
+                            pulse = midi_parser.clock_pulses
+                            clock_starts = midi_parser.clock_starts
+                        pulse += step_clocks
+                        due = midi_parser.clock_time(pulse)
+                        yield time.ticks_add(due, -SEQUENCER_LEAD_US)
+
+                        # The time estimated again by the latest clock pulse
+                        if clock_synced() and clock_starts == midi_parser.clock_starts:
+                            due = midi_parser.clock_time(pulse)
+
+                    # The next step on step_wait
+                    else:
+                        pulse = -1
+                        due = time.ticks_add(due, int(step_wait * 1000000))
+                        yield time.ticks_add(due, -SEQUENCER_LEAD_US)
                 
                 elif line[0] == "#":
-                    parse_command(line)
+                    if parse_command(line):
+                        rebase = True
 
                 elif line[0] == "|":
                     parse_scale(line)
@@ -1940,78 +2062,444 @@ def piano_role_player(score_file="score1.txt", file_encode="utf-8"):
         return
 
 
+#--- Synthesizer engine on core 1
+# The engine thread owns the synthesizer state in YMF825pico (SPI, voices, tone slots, MIDI routes).
+# UI on core 0 asks the engine to change it by engine_call(), the engine runs the calls between MIDI batches.
+# UI can read the synthesizer data and save it to files without asking the engine.
+ENGINE_QUEUE_SIZE = 8
+engine_queue = [None] * ENGINE_QUEUE_SIZE   # (function, arguments) ring buffer
+engine_queue_head = 0                       # Next index to put (changed by core 0 only)
+engine_queue_tail = 0                       # Next index to run (changed by core 1 only)
+engine_posted = 0                           # Serial number of the last call put
+engine_done = 0                             # Serial number of the last call finished
+engine_result = None                        # Returned value of the last call
+engine_error = None                         # Exception raised by the last call, None: no exception
+engine_thread_id = None                     # Thread ID of the engine, None: the engine thread is not working
+engine_stopped = False                      # True: the engine thread stopped by an error
+
+
+# Call a function in the engine thread, and wait for it.
+# The calls are run by the caller when the engine thread is not working (not started or stopped).
+#   func:: function to call
+#   args:: arguments of the function
+#
+#   RETURN:: returned value of the function (the exception raised by the function is raised again)
+def engine_call(func, *args):
+    global engine_queue_head, engine_posted
+
+    # Call it directly before starting the engine thread or in the engine thread
+    if engine_thread_id is None or _thread.get_ident() == engine_thread_id:
+        return func(*args)
+
+    # Wait for a room in the queue
+    nxt = (engine_queue_head + 1) % ENGINE_QUEUE_SIZE
+    while nxt == engine_queue_tail:
+        if engine_thread_id is None:
+            engine_run_calls()
+        else:
+            time.sleep_ms(1)
+
+    engine_queue[engine_queue_head] = (func, args)
+    engine_posted += 1
+    serial = engine_posted
+    engine_queue_head = nxt
+
+    # Wait for the call finished
+    while engine_done < serial:
+        if engine_thread_id is None:
+            engine_run_calls()
+        else:
+            time.sleep_ms(1)
+
+    if engine_error is not None:
+        raise engine_error
+
+    return engine_result
+
+
+# Run the calls in the queue (in the engine thread).
+# The returned value or the exception of the last call is passed to engine_call().
+def engine_run_calls():
+    global engine_queue_tail, engine_done, engine_result, engine_error
+
+    while engine_queue_tail != engine_queue_head:
+        (func, args) = engine_queue[engine_queue_tail]
+        engine_queue[engine_queue_tail] = None
+        engine_result = None
+        engine_error = None
+        try:
+            engine_result = func(*args)
+        except Exception as e:
+            engine_error = e
+
+        engine_queue_tail = (engine_queue_tail + 1) % ENGINE_QUEUE_SIZE
+        engine_done += 1
+
+
+# Synthesizer engine thread (core 1)
+#   midi_in:: MIDI UART ring buffer
+def engine_thread(midi_in):
+    global engine_thread_id, engine_stopped
+
+    engine_thread_id = _thread.get_ident()
+    midi_buf = bytearray(64)
+    try:
+        while True:
+            # An error in a loop is printed, and the engine keeps working
+            try:
+                engine_step(midi_in, midi_buf)
+            except Exception as e:
+                print("ENGINE ERROR:", e)
+
+    finally:
+        # UI runs the calls by itself after the engine stopped
+        engine_stopped = True
+        engine_thread_id = None
+
+
+# A loop of the engine thread
+#   midi_in:: MIDI UART ring buffer
+#   midi_buf:: buffer to read MIDI bytes into
+def engine_step(midi_in, midi_buf):
+    # MIDI keyboard UART receive (the ring buffer is filled by the UART interrupt)
+    if midi_in.any() > 0:
+        length = midi_in.readinto(midi_buf)
+        if MIDI_OUT == MIDI_OUT_THRU:
+            midi_out.thru(midi_buf, length)
+
+        # MIDI envets for YMF825pico (real time messages and SysEx are dropped by the parser)
+        pos = 0
+        while pos < length:
+            pos = midi_parser.parse(midi_buf, pos, length)
+            if midi_parser.event_count > 0:
+#                print("MIDI EVENTS:[", midi_parser.event_count, "]=", midi_parser.events)
+                midi_interface(midi_parser.events, midi_parser.event_count)
+
+    # YMF825 jobs, score steps and the events due
+    busy = engine_play()
+    if midi_out is not None:
+        midi_out.flush()
+
+    # Calls from UI and saving a record edited wait for the YMF825 job
+    if not busy:
+        engine_run_calls()
+        persist_run(midi_in)
+
+
+#--- YMF825 jobs
+# Tone and equalizer bursts wait for YMF825 (20 msec after the burst write mode).
+# The engine runs the steps of a job (*_steps() of YMF825pico) by the time each step yields, not waiting in it.
+# The score steps, the events and the calls from UI wait for the job, MIDI bytes are received and sent while waiting.
+chip_jobs = []                          # Jobs waiting to start
+chip_job = None                         # Job working, None: no job
+chip_resume = 0                         # Time (ticks_ms) to resume the job
+
+
+# Start a YMF825 job (the first step is run now when no job is working)
+#   steps:: generator yielding the time (msec) to wait after each step
+def chip_start(steps):
+    # Nobody runs the job after the engine stopped
+    if engine_stopped:
+        YMF825pico.wait_steps(steps)
+        return
+
+    chip_jobs.append(steps)
+    if chip_job is None:
+        chip_run()
+
+
+# Is a YMF825 job working or waiting
+#   RETURN:: True: YMF825 is busy
+def chip_busy():
+    return chip_job is not None or len(chip_jobs) > 0
+
+
+# Run the steps of the YMF825 jobs at the time
+#   RETURN:: True: a job is working
+def chip_run():
+    global chip_job, chip_resume
+
+    while True:
+        if chip_job is None:
+            if len(chip_jobs) == 0:
+                return False
+            chip_job = chip_jobs.pop(0)
+            chip_resume = time.ticks_ms()
+
+        if time.ticks_diff(time.ticks_ms(), chip_resume) < 0:
+            return True
+
+        try:
+            msec = next(chip_job)
+            YMF825pico.flush_spi_queue()
+            chip_resume = time.ticks_add(time.ticks_ms(), msec)
+        except StopIteration:
+            YMF825pico.flush_spi_queue()
+            chip_job = None
+        except:
+            chip_job = None
+            raise
+
+
+# Run the YMF825 jobs, the sequencer and the events due
+#   RETURN:: True: a YMF825 job is working (the sequencer and the events wait)
+def engine_play():
+    if chip_run():
+        return True
+
+    sequencer_run()
+    if chip_busy():
+        return True
+
+    dispatch_events()
+    return False
+
+
+#--- Write-behind persistence
+# Mark a record to save (the engine saves it later)
+#   kind:: PERSIST_*
+#   n:: tone, timbre or equalizer index
+def persist(kind, n):
+    engine_call(persistence.mark, kind, n)
+
+
+# Save a step of a record marked when the engine is idle (in the engine)
+#   midi_in:: MIDI UART ring buffer
+#
+#   RETURN:: True: a step is done
+def persist_run(midi_in):
+    if not persistence.pending() or midi_in.any() > 0:
+        return False
+
+    wait = event_queue.wait_us()
+    if wait >= 0 and wait < PERSIST_IDLE_US:
+        return False
+
+    if sequencer is not None and time.ticks_diff(sequencer_resume, time.ticks_us()) < PERSIST_IDLE_US:
+        return False
+
+    return persistence.step()
+
+
+# Savers of the names (steps)
+def save_tone_name(tone):
+    return YMF825pico.save_name_steps(NAME_TONE, tone)
+
+
+def save_timbre_name(timbre):
+    return YMF825pico.save_name_steps(NAME_TIMBRE, timbre)
+
+
+def save_equalizer_name(eql):
+    return YMF825pico.save_name_steps(NAME_EQUALIZER, eql)
+
+
+#--- uasyncio tasks (ENGINE_THREAD is False)
+
+
+# MIDI ingest, YMF825 jobs and event dispatch task
+#   midi_in:: MIDI UART ring buffer
+async def midi_task(midi_in):
+    midi_buf = bytearray(64)
+    while True:
+        start = time.ticks_ms()
+        while midi_in.any() > 0 and time.ticks_diff(time.ticks_ms(), start) < MIDI_TASK_BUDGET_MS:
+            length = midi_in.readinto(midi_buf)
+            if MIDI_OUT == MIDI_OUT_THRU:
+                midi_out.thru(midi_buf, length)
+
+            pos = 0
+            while pos < length:
+                pos = midi_parser.parse(midi_buf, pos, length)
+                if midi_parser.event_count > 0:
+                    midi_interface(midi_parser.events, midi_parser.event_count)
+
+        if not chip_run():
+            dispatch_events()
+
+        if midi_out is not None:
+            midi_out.flush()
+
+        await asyncio.sleep_ms(0)
+
+
+# Sequencer task
+#   Runs the score steps due (not while a YMF825 job is working), and sleeps to the next step.
+async def sequencer_task():
+    while True:
+        start = time.ticks_ms()
+        while sequencer is not None and not chip_busy() and time.ticks_diff(time.ticks_us(), sequencer_resume) >= 0 and time.ticks_diff(time.ticks_ms(), start) < SEQUENCER_TASK_BUDGET_MS:
+            sequencer_run()
+
+        if sequencer is not None and chip_busy():
+            await asyncio.sleep_ms(0)
+        elif sequencer is not None:
+            wait = time.ticks_diff(sequencer_resume, time.ticks_us()) // 1000
+            await asyncio.sleep_ms(min(max(wait, 0), SEQUENCER_TASK_PERIOD_MS))
+        else:
+            await asyncio.sleep_ms(SEQUENCER_TASK_PERIOD_MS)
+
+
+# Write-behind persistence task
+#   Saves the records marked in steps while MIDI, the events and YMF825 are idle.
+#   midi_in:: MIDI UART ring buffer
+async def persist_task(midi_in):
+    while True:
+        start = time.ticks_ms()
+        saved = False
+        while not chip_busy() and time.ticks_diff(time.ticks_ms(), start) < PERSIST_TASK_BUDGET_MS and persist_run(midi_in):
+            saved = True
+
+        await asyncio.sleep_ms(0 if saved else PERSIST_TASK_PERIOD_MS)
+
+
+# Rotary encoder task
+async def encoder_task():
+    while True:
+        get_rotary_encoders()
+        await asyncio.sleep_ms(ENCODER_POLL_MS)
+
+
+# Display refresh task
+async def display_task():
+    global display_dirty
+
+    while True:
+        if display_dirty:
+            display_dirty = False
+            display.show()
+
+        await asyncio.sleep_ms(DISPLAY_TASK_PERIOD_MS)
+
+
+# Start up the synthesizer and run the tasks
+#   midi_in:: MIDI UART ring buffer
+async def main_tasks(midi_in):
+    # YMF825 reset waits are awaited
+    for msec in YMF825pico.turn_on_synthesizer_steps():
+        YMF825pico.flush_spi_queue()
+        await asyncio.sleep_ms(msec)
+
+    YMF825pico.setup_synth()
+    setup_module()
+    show_menu(0)
+
+    asyncio.create_task(display_task())
+    asyncio.create_task(encoder_task())
+    asyncio.create_task(sequencer_task())
+    asyncio.create_task(persist_task(midi_in))
+    play_score("demo1.txt")
+    await midi_task(midi_in)
+
+
 #Receive MIDI (work in a thread)
-timbre_offset = 0
+#   Post the MIDI events to the event queue to dispatch now.
+#   The events due are dispatched to make room when the queue is full,
+#   an event is dropped (counted in the event queue statistics) if the queue is full of the events not due yet.
+#   midi_events:: [status, data1, data2] * length made by midi_parser_class
+#   length:: number of events
 def midi_interface(midi_events, length):
+    now = time.ticks_us()
+    for bt in range(0, length * 3, 3):
+        if MIDI_OUT == MIDI_OUT_MERGE:
+            midi_out.send(midi_events[bt], midi_events[bt + 1], midi_events[bt + 2])
+
+        if event_queue.count == event_queue.CAPACITY:
+            # The queue is full (the chip is written only in the dispatcher)
+            dispatch_events()
+
+        event_queue.post(now, midi_events[bt], midi_events[bt + 1], midi_events[bt + 2])
+
+
+# Dispatch the events due in the event queue (in the engine)
+def dispatch_events():
+    if event_queue.wait_us() == 0:
+        # Register writes for the events are sent at once
+        YMF825pico.begin_spi_queue()
+        try:
+            event_queue.dispatch(event_handler)
+        finally:
+            YMF825pico.end_spi_queue()
+
+
+# Event handler
+#   status, data1, data2:: event bytes
+def event_handler(status, data1, data2):
+    # MIDI channel message
+    if status >= 0x80:
+        midi_message(status, data1, data2)
+
+    # Score note on (the same note playing is stopped)
+    elif status >= EVENT_NOTE_ON:
+        YMF825pico.stop_by_timbre_note(status & 0x0f, data1)
+        YMF825pico.play_by_timbre_note(status & 0x0f, data1, data2)
+        if MIDI_OUT == MIDI_OUT_MERGE:
+            midi_out.send(0x90 | (status & 0x0f), data1, 0)
+            midi_out.send(0x90 | (status & 0x0f), data1, data2)
+
+    # Score note off
+    else:
+        YMF825pico.stop_by_timbre_note(status & 0x0f, data1)
+        if MIDI_OUT == MIDI_OUT_MERGE:
+            midi_out.send(0x90 | (status & 0x0f), data1, 0)
+
+
+# MIDI channel message
+#   midi_cmd:: status
+#   midi_note:: data1
+#   midi_velo:: data2
+timbre_offset = 0
+def midi_message(midi_cmd, midi_note, midi_velo):
     global timbre_offset
 
-    midich = {}
-    for p in list(range(YMF825pico.TIMBRE_PORTIONS)):
-        ch = "CH" + str(YMF825pico.get_playing_timbre_midich(p))
-        if ch in midich:
-            midich[ch].append(p)
-        else:
-            midich[ch] = [p]
-#    print("MIDI CH, length, events=", midich, length, midi_events)
-
-    bt = 0
-    while bt < length:
-        # MIDI command
-        midi_cmd  = midi_events[bt]
-        bt += 1
-        left = length - bt
-#        print("MIDI CMD, left=", midi_cmd, left)
-        if left >= 2:
-            # MIDI note
-            midi_note = midi_events[bt]
-            # MIDI velocity
-            midi_velo = midi_events[bt + 1]
-            bt += 2
-
-            # note on: 0x9n (n=0..f: MIDI CH)
-            if (midi_cmd & 0xf0) == 0x90:
-                ch = "CH" + str(midi_cmd - 0x90 + 1)
-#                print("note on :", ch, midi_note, midi_velo)
-                if ch in midich:
-                    for portion in midich[ch]:
-                        # note off
-                        if midi_velo == 0:
-                            YMF825pico.stop_by_timbre_note((portion + timbre_offset) % YMF825pico.TIMBRE_PORTIONS, midi_note)
-                        # note on
-                        else:
-                            YMF825pico.play_by_timbre_note((portion + timbre_offset) % YMF825pico.TIMBRE_PORTIONS, midi_note, midi_velo)
-
-            # note off: 0x8n (n=0..f: MIDI CH)
-            elif (midi_cmd & 0xf0) == 0x80:
-                ch = "CH" + str(midi_cmd - 0x80 + 1)
-#                print("note off:", ch, midi_note, midi_velo)
-                if ch in midich:
-                    for portion in midich[ch]:
-                        YMF825pico.stop_by_timbre_note((portion + timbre_offset) % YMF825pico.TIMBRE_PORTIONS, midi_note)
+    # Timbre portions to play each MIDI channel (timbre_offset is applied)
+    midi_routes = YMF825pico.midi_routes
+    key_from = YMF825pico.portion_key_from
+    key_to = YMF825pico.portion_key_to
+
+    # note on: 0x9n (n=0..f: MIDI CH)
+    if (midi_cmd & 0xf0) == 0x90:
+#        print("note on :", midi_cmd & 0x0f, midi_note, midi_velo)
+        for portion in midi_routes[midi_cmd & 0x0f]:
+            # note off
+            if midi_velo == 0:
+                YMF825pico.stop_by_timbre_note(portion, midi_note)
+            # note on (in the key range of the portion)
+            elif key_from[portion] <= midi_note and midi_note <= key_to[portion]:
+                YMF825pico.play_by_timbre_note(portion, midi_note, midi_velo)
+
+    # note off: 0x8n (n=0..f: MIDI CH)
+    elif (midi_cmd & 0xf0) == 0x80:
+#        print("note off:", midi_cmd & 0x0f, midi_note, midi_velo)
+        for portion in midi_routes[midi_cmd & 0x0f]:
+            YMF825pico.stop_by_timbre_note(portion, midi_note)
+    
+    # Control
+    elif (midi_cmd & 0xf0) == 0xb0:
+        # Chanel -> Timbre
+        timbre = (midi_cmd - 0xb0 + timbre_offset) % YMF825pico.TIMBRE_PORTIONS
         
-            # Control
-            elif (midi_cmd & 0xf0) == 0xb0:
-                # Chanel -> Timbre
-                timbre = (midi_cmd - 0xb0 + timbre_offset) % YMF825pico.TIMBRE_PORTIONS
-                
-                # sustain: pressed:[2]==0x7f / released [2]==0
-                if midi_note == 0x40:
-                    YMF825pico.sustain_pedal(timbre, midi_velo == 0x7f)
-
-                # modulation --> reset timbre_offset
-                elif midi_note == 0x01:
-                    timbre_offset = 0
-#                    print("MIDI: Modulation")
-
-            # Pitch --> Timbre shift
-            elif (midi_cmd & 0xf0) == 0xe0:
-                # pitch+ --> timbre+
-                if midi_note == 0x47:
-                    timbre_offset = (timbre_offset + 1) % YMF825pico.TIMBRE_PORTIONS
-            
-                # pitch- --> timbre-
-                elif midi_note == 0x39:
-                    timbre_offset = (timbre_offset - 1) % YMF825pico.TIMBRE_PORTIONS
+        # sustain: pressed:[2]==0x7f / released [2]==0
+        if midi_note == 0x40:
+            YMF825pico.sustain_pedal(timbre, midi_velo == 0x7f)
+
+        # modulation --> reset timbre_offset
+        elif midi_note == 0x01:
+            timbre_offset = 0
+            YMF825pico.build_midi_routes(timbre_offset)
+#            print("MIDI: Modulation")
+
+    # Pitch --> Timbre shift
+    elif (midi_cmd & 0xf0) == 0xe0:
+        # pitch+ --> timbre+
+        if midi_note == 0x47:
+            timbre_offset = (timbre_offset + 1) % YMF825pico.TIMBRE_PORTIONS
+            YMF825pico.build_midi_routes(timbre_offset)
+    
+        # pitch- --> timbre-
+        elif midi_note == 0x39:
+            timbre_offset = (timbre_offset - 1) % YMF825pico.TIMBRE_PORTIONS
+            YMF825pico.build_midi_routes(timbre_offset)
 
 
 #Set up this module
@@ -2032,7 +2520,7 @@ def setup_module():
 
 #Initialize the application
 def init():
-    global display
+    global display, rotary_encoders
     
     print("init.")
 
@@ -2049,9 +2537,7 @@ def init():
     display.show()
 
     # Rotary encoder pins
-    for rte in ROTARY_ENCODERS:
-        rte["A_SW"] = Pin(rte["A_PIN"], Pin.IN, Pin.PULL_UP)
-        rte["B_SW"] = Pin(rte["B_PIN"], Pin.IN, Pin.PULL_UP)
+    rotary_encoders = rotary_encoder_class([(rte["A_PIN"], rte["B_PIN"]) for rte in ROTARY_ENCODERS], [rte["ACCEL"] for rte in ROTARY_ENCODERS])
 
     print("init end.")
 
@@ -2065,11 +2551,22 @@ if __name__=='__main__':
     # UART
 #    uart = UART(UART_CH, baudrate=UART_BAUDRATE, tx=Pin(UART_TX), rx=Pin(UART_RX), bits=8, parity=None, stop=1, rxbuf=512)
     uart = UART(UART_CH, baudrate=UART_BAUDRATE, tx=Pin(UART_TX), rx=Pin(UART_RX), bits=8, parity=None, stop=1)
+    if MIDI_OUT != MIDI_OUT_OFF:
+        midi_out = midi_out_class(uart, baudrate=UART_BAUDRATE)
 
     # YMF825
     YMF825pico = ymf825pico_class()
+    persistence = persistence_class([YMF825pico.save_tone_steps, YMF825pico.save_timbre_steps, YMF825pico.save_equalizer_steps, save_tone_name, save_timbre_name, save_equalizer_name], PERSIST_DELAY_MS)
     init()
 
+    # The engine and UI work as uasyncio tasks
+    if not ENGINE_THREAD:
+        try:
+            asyncio.run(main_tasks(midi_uart_class(uart)))
+        finally:
+            # Save the records edited at shutdown
+            persistence.flush()
+
     # YMF825 control class
 #    print("YMF825 PICO CLASS")
     YMF825pico.turn_on_synthesizer()
@@ -2081,44 +2578,22 @@ if __name__=='__main__':
 
     show_menu(0)
 
-    # UART
-#    uart_read = True
-    cmd_data = 0
-    read_bytes = []
-    while True:
-        # MIDI keyboard UART receive
-        length = uart.any()
-        if length > 0:
-            read_byte = uart.read(1)
-#            uart_read = True
-
-            # MIDI envets for YMF825pico
-            midi_cmd = read_byte[0] & 0xf0
-            if midi_cmd == 0x90 or midi_cmd == 0x80 or midi_cmd == 0xb0 or midi_cmd == 0xe0:
-                cmd_data = 2
-                read_bytes.append(read_byte[0])
-            elif cmd_data > 0:
-                read_bytes.append(read_byte[0])
-                cmd_data -= 1
-
-        elif cmd_data == 0 and len(read_bytes) > 0:
-#            print("UART:[", length, "]=", read_bytes)
-#            for bt in read_bytes:
-#                print("data=", hex(bt))
-
-            # Ignore MIDI real time clock and active sensing (too many data!!)
-#            uart_read = False
-            midi_interface(read_bytes, len(read_bytes))
-            del read_bytes
-            read_bytes = []
-
-#        elif cmd_data > 0:
-#            print("WAITING FOR PARAMETERS:", cmd_data)
-
-#        if not uart_read:
-        if cmd_data == 0:
+    # Synthesizer engine works on core 1
+    midi_in = midi_uart_class(uart)
+    _thread.start_new_thread(engine_thread, (midi_in,))
+    while engine_thread_id is None:
+        time.sleep_ms(1)
+
+    # UI works on core 0
+    try:
+        while True:
             # Get rotary encoders
             get_rotary_encoders()
+            time.sleep_ms(ENCODER_POLL_MS)
+
+    finally:
+        # Save the records edited at shutdown
+        engine_call(persistence.flush)
 
 
 #    print("QUIT.")